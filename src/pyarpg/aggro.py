@@ -0,0 +1,93 @@
+import heapq
+import itertools
+
+
+class AggroTracker:
+    """Turns enemy aggro on and off from events instead of per-frame checks.
+
+    Each tick one grid query around the player, sized by the largest
+    aggro range, finds the enemies within their own aggro range. Enemies
+    entering that set pull aggro, enemies leaving it get their aggro
+    expiry scheduled aggro_time later. Getting hit pulls aggro as well,
+    refreshes the expiry and spreads aggro to idle enemies within
+    propagation_radius of the hit one. Expiries sit in a heap keyed by
+    world.time, superseded entries are skipped when popped.
+
+    Attach to the enemy SpatialGroup with add_index.
+    """
+
+    def __init__(self, propagation_radius=150):
+        self.propagation_radius = propagation_radius
+        self.in_range = {}
+        self.expires_at = {}
+        self._heap = []
+        self._seq = itertools.count()
+
+    def insert(self, enemy):
+        pass
+
+    def remove(self, enemy):
+        self.in_range.pop(enemy, None)
+        self.expires_at.pop(enemy, None)
+
+    def _pull(self, enemy, world):
+        if not enemy.is_aggro:
+            enemy.is_aggro = True
+            if world.ai is not None:
+                world.ai.wake(enemy)
+
+    def _schedule_expiry(self, enemy, at):
+        self.expires_at[enemy] = at
+        heapq.heappush(self._heap, (at, next(self._seq), enemy))
+
+    def on_hit(self, enemy, world, propagate=True):
+        self._pull(enemy, world)
+        if enemy not in self.in_range:
+            self._schedule_expiry(enemy, world.time + enemy.aggro_time)
+
+        if not propagate:
+            return
+
+        for other in world.get_enemies_in_radius(enemy.pos, self.propagation_radius):
+            if not other.is_aggro:
+                self.on_hit(other, world, propagate=False)
+
+    def restore(self, enemy, world, is_aggro, in_range, expires_at=None):
+        """Put back the aggro state of a freshly added enemy, see snapshot.restore."""
+        if is_aggro:
+            self._pull(enemy, world)
+        if in_range:
+            self.in_range[enemy] = None
+        if expires_at is not None:
+            self._schedule_expiry(enemy, expires_at)
+
+    def update(self, world):
+        player_pos = world.get_player().pos
+        px, py = player_pos
+
+        in_range = {}
+        for enemy in world.enemies.query_radius(player_pos, world.max_aggro_range):
+            cx, cy = enemy.rect.center
+            if (cx - px) ** 2 + (cy - py) ** 2 <= enemy.aggro_range * enemy.aggro_range:
+                in_range[enemy] = None
+
+        for enemy in in_range:
+            if enemy not in self.in_range:
+                # held while in range, a pending expiry no longer applies
+                self.expires_at.pop(enemy, None)
+                self._pull(enemy, world)
+
+        for enemy in self.in_range:
+            if enemy not in in_range:
+                self._schedule_expiry(enemy, world.time + enemy.aggro_time)
+
+        self.in_range = in_range
+        self._expire(world.time)
+
+    def _expire(self, now):
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            at, _, enemy = heapq.heappop(heap)
+            if self.expires_at.get(enemy) == at:
+                del self.expires_at[enemy]
+                enemy.is_aggro = False
@@ -0,0 +1,218 @@
+"""Pre-baked image cache.
+
+Stores the fully processed images (scaled, muted, flash variants, ...) as
+raw RGBA buffers in a single pack file. Loading maps the file into memory and
+wraps each entry with pygame.image.frombuffer, so nothing is decoded again,
+and copies it into a surface of its own before the pack is closed.
+Entries are keyed by their source file's mtime and size and rebuilt when the
+source changes. Build or refresh the pack ahead of time with
+
+    python -m pyarpg.asset_cache
+"""
+import json
+import mmap
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from pyarpg.assets import IMAGE_RECIPES
+from pyarpg.assets import FLASH_SUFFIX
+from pyarpg.assets import SPRITE_DICT
+from pyarpg.assets import convert_for_display
+from pyarpg.assets import decode_image
+from pyarpg.assets import flash
+from pyarpg.config import CACHE_DIR
+
+PACK_PATH = CACHE_DIR / "sprites.pack"
+
+# bump when the pack layout or any image recipe changes
+PACK_VERSION = 1
+_MAGIC = b"PYARPGPK"
+_HEADER = struct.Struct("<8sII")
+_ALIGN = 16
+
+
+def image_stamp(name, recipes=IMAGE_RECIPES):
+    if name.endswith(FLASH_SUFFIX):
+        return image_stamp(name[:-len(FLASH_SUFFIX)], recipes) + FLASH_SUFFIX
+
+    path, _ = recipes[name]
+    stat = os.stat(path)
+    return f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def build_image(name, recipes=IMAGE_RECIPES):
+    """Decode and process an image exactly like the lazy registry does, minus convert."""
+    if name.endswith(FLASH_SUFFIX):
+        return flash(build_image(name[:-len(FLASH_SUFFIX)], recipes))
+
+    path, process = recipes[name]
+    return decode_image(path, process)
+
+
+class AssetPack:
+    """Read side of the pack file plus rewriting it with new entries."""
+
+    def __init__(self, path=PACK_PATH):
+        self.path = path
+        self.entries = {}
+        self._file = None
+        self._mmap = None
+        self._open()
+
+    def _open(self):
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+
+        try:
+            # a private copy-on-write mapping, surfaces built on top of it may be drawn on
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_COPY)
+            magic, version, index_size = _HEADER.unpack_from(self._mmap, 0)
+            if magic != _MAGIC or version != PACK_VERSION:
+                return
+
+            index = self._mmap[_HEADER.size:_HEADER.size + index_size]
+            self.entries = json.loads(index.decode("utf-8"))
+        except (ValueError, struct.error):
+            self.entries = {}
+
+    def close(self):
+        """Unmap and close the file, surfaces from get must not be used anymore."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def get(self, name, stamp):
+        """Surface of name on top of the mapping, None if missing or stale."""
+        entry = self.entries.get(name)
+        if entry is None or entry["stamp"] != stamp:
+            return None
+
+        offset = entry["offset"]
+        size = entry["size"]
+        buffer = memoryview(self._mmap)[offset:offset + size[0] * size[1] * 4]
+        surface = pygame.image.frombuffer(buffer, size, "RGBA")
+        if entry["alpha"] is not None:
+            surface.set_alpha(entry["alpha"])
+
+        return surface
+
+    def _raw(self, name):
+        entry = self.entries[name]
+        size = entry["size"]
+        return self._mmap[entry["offset"]:entry["offset"] + size[0] * size[1] * 4]
+
+    def write(self, surfaces):
+        """Rewrite the pack with the given {name: (stamp, surface)} on top of the current entries."""
+        blobs = {name: (entry["stamp"], entry["size"], entry["alpha"], self._raw(name)) for name, entry in self.entries.items() if name not in surfaces}
+        for name, (stamp, surface) in surfaces.items():
+            blobs[name] = (stamp, list(surface.get_size()), surface.get_alpha(), pygame.image.tobytes(surface, "RGBA"))
+
+        # offsets depend on the index length, so lay out once with a guessed size
+        index_size = 0
+        while True:
+            data_start = _aligned(_HEADER.size + index_size)
+            index = {}
+            offset = data_start
+            for name, (stamp, size, alpha, raw) in blobs.items():
+                index[name] = {"stamp": stamp, "size": size, "alpha": alpha, "offset": offset}
+                offset = _aligned(offset + len(raw))
+
+            index_bytes = json.dumps(index).encode("utf-8")
+            if _aligned(_HEADER.size + len(index_bytes)) == data_start:
+                break
+            index_size = len(index_bytes)
+
+        os.makedirs(self.path.parent, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, PACK_VERSION, len(index_bytes)))
+            f.write(index_bytes)
+            for name, (stamp, size, alpha, raw) in blobs.items():
+                f.seek(index[name]["offset"])
+                f.write(raw)
+
+        # an open file can't be replaced on Windows, everything needed was copied into blobs
+        self.close()
+        os.replace(tmp_path, self.path)
+        self._open()
+
+
+def _aligned(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _own_surface(surface):
+    converted = convert_for_display(surface)
+    # headless runs don't convert, copy so nothing points into the pack once it is closed
+    return surface.copy() if converted is surface else converted
+
+
+def _load_from_pack(pack, names, registry, recipes):
+    """Stores every name that the pack has up to date, returns (missing names, {name: stamp})."""
+    stamps = {}
+    missing = []
+    for name in names:
+        if registry.is_loaded(name):
+            continue
+
+        stamps[name] = image_stamp(name, recipes)
+        surface = pack.get(name, stamps[name])
+        if surface is None:
+            missing.append(name)
+        else:
+            registry.store(name, _own_surface(surface))
+
+    return missing, stamps
+
+
+def prefetch_images(names, registry=SPRITE_DICT, recipes=IMAGE_RECIPES, pack_path=PACK_PATH, max_workers=None, update_pack=True):
+    """Fill registry with names from the pack, decoding misses in a thread pool."""
+    pack = AssetPack(pack_path)
+    try:
+        missing, stamps = _load_from_pack(pack, names, registry, recipes)
+        if not missing:
+            return
+
+        # pygame releases the GIL while decoding and scaling, so this scales with cores
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            decoded = dict(zip(missing, pool.map(lambda name: build_image(name, recipes), missing)))
+
+        for name, surface in decoded.items():
+            registry.store(name, convert_for_display(surface))
+
+        if update_pack:
+            pack.write({name: (stamps[name], surface) for name, surface in decoded.items()})
+    finally:
+        pack.close()
+
+
+def build_pack(pack_path=PACK_PATH, recipes=IMAGE_RECIPES, max_workers=None):
+    names = list(recipes) + [name + FLASH_SUFFIX for name in recipes]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        decoded = dict(zip(names, pool.map(lambda name: build_image(name, recipes), names)))
+
+    pack = AssetPack(pack_path)
+    try:
+        pack.write({name: (image_stamp(name, recipes), surface) for name, surface in decoded.items()})
+    finally:
+        pack.close()
+    return names
+
+
+def main():
+    pygame.init()
+    names = build_pack()
+    print(f"Packed {len(names)} images into {PACK_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,67 +17,181 @@ def fake_desaturate(surface, strength=0.5):
     out.blit(gray, (0, 0))
     return out
 
-def _add_flash_images(img_dict, suffix="_flash"):
-    new_imgs = {}
-    for img_name, img in img_dict.items():
-        flash_image = img.copy()
-        flash_image.fill((40, 40, 40), special_flags=pygame.BLEND_RGB_ADD)
-
-        new_imgs[img_name + suffix] = flash_image
-    
-    img_dict.update(new_imgs)
-
-def load_images(img_dir):
-    img_dict = {
-        "player": pygame.image.load(img_dir / "player3.png").convert_alpha(),
-        "fireball": pygame.image.load(img_dir / "fireball.png").convert_alpha(),
-        "dummy": pygame.image.load(img_dir / "dummy.png").convert_alpha(),
-        "melee": pygame.image.load(img_dir / "melee.png").convert_alpha(),
-        "drop_globe": pygame.image.load(img_dir / "monster_globe_drop_test.png").convert_alpha(),
-        "empty_skill_slot": pygame.transform.scale(pygame.image.load(img_dir / "empty_skill_slot.png").convert_alpha(), (48, 48)),
-        "blue_bean_ellipsis": pygame.image.load(img_dir / "blue_bean_ellipsis.png").convert_alpha(),
-        "ring_of_fire": mute(pygame.transform.scale(pygame.image.load(img_dir / "ring_of_fire_no_outline.png").convert_alpha(), (64 * 12 * 4, 150))),
-        "tree1": pygame.image.load(img_dir / "tree_1.png").convert_alpha(),
-        "portal": pygame.image.load(img_dir / "portal1.png").convert_alpha(),
-        "player_test": pygame.transform.scale(pygame.image.load(img_dir / "player_test.png").convert_alpha(), (60, 72))
+def flash(surface):
+    out = surface.copy()
+    out.fill((40, 40, 40), special_flags=pygame.BLEND_RGB_ADD)
+    return out
+
+def with_alpha(surface, alpha):
+    surface.set_alpha(alpha)
+    return surface
+
+def convert_for_display(image):
+    # converting needs a display mode, headless runs keep the decoded surface
+    if pygame.display.get_surface() is not None:
+        image = image.convert_alpha()
+    return image
+
+def decode_image(path, process=None):
+    """Decode and post-process an image without touching the display."""
+    image = pygame.image.load(path)
+    if process is not None:
+        image = process(image)
+    return image
+
+
+class AssetRegistry:
+    """Dict-style asset lookup that loads each entry on first access.
+
+    loaders maps a name to a callable taking the registry, so derived assets
+    can be built from other entries. Names ending in derived_suffix that have
+    no loader of their own are built by passing the base asset to derive.
+    """
+
+    def __init__(self, loaders, derive=None, derived_suffix=None):
+        self._loaders = loaders
+        self._derive = derive
+        self._derived_suffix = derived_suffix
+        self._assets = {}
+
+    def _loader(self, name):
+        loader = self._loaders.get(name)
+        if loader is not None:
+            return loader
+
+        if self._derive is not None and name.endswith(self._derived_suffix):
+            base_name = name[:-len(self._derived_suffix)]
+            if base_name in self._loaders:
+                return lambda assets: self._derive(assets[base_name])
+
+        return None
+
+    def __getitem__(self, name):
+        asset = self._assets.get(name)
+        if asset is None:
+            loader = self._loader(name)
+            if loader is None:
+                raise KeyError(name)
+
+            asset = loader(self)
+            self._assets[name] = asset
+
+        return asset
+
+    def __contains__(self, name):
+        return self._loader(name) is not None
+
+    def keys(self):
+        keys = list(self._loaders)
+        if self._derive is not None:
+            keys += [name + self._derived_suffix for name in self._loaders]
+        return keys
+
+    def is_loaded(self, name):
+        return name in self._assets
+
+    def loaded(self):
+        return dict(self._assets)
+
+    def prefetch(self, names):
+        for name in names:
+            self[name]
+
+    def store(self, name, asset):
+        self._assets[name] = asset
+
+    def unload(self, name):
+        self._assets.pop(name, None)
+
+
+def image_recipes(img_dir):
+    """Image name -> (source file, post-processing of the decoded image)."""
+    return {
+        "player": (img_dir / "player3.png", None),
+        "fireball": (img_dir / "fireball.png", lambda img: with_alpha(img, 180)),
+        "dummy": (img_dir / "dummy.png", None),
+        "melee": (img_dir / "melee.png", None),
+        "drop_globe": (img_dir / "monster_globe_drop_test.png", lambda img: with_alpha(img, 160)),
+        "empty_skill_slot": (img_dir / "empty_skill_slot.png", lambda img: pygame.transform.scale(img, (48, 48))),
+        "blue_bean_ellipsis": (img_dir / "blue_bean_ellipsis.png", None),
+        "ring_of_fire": (img_dir / "ring_of_fire_no_outline.png", lambda img: mute(pygame.transform.scale(img, (64 * 12 * 4, 150)))),
+        "tree1": (img_dir / "tree_1.png", None),
+        "portal": (img_dir / "portal1.png", None),
+        "player_test": (img_dir / "player_test.png", lambda img: pygame.transform.scale(img, (60, 72))),
     }
 
-    img_dict["fireball"].set_alpha(180)
-    img_dict["drop_globe"].set_alpha(160)
-    #img_dict["empty_skill_slot"].set_alpha(120)
+def image_loaders(recipes):
+    return {
+        name: lambda assets, path=path, process=process: convert_for_display(decode_image(path, process))
+        for name, (path, process) in recipes.items()
+    }
 
-    _add_flash_images(img_dict)
+def _load_sound(path, volume):
+    sound = pygame.Sound(path)
+    sound.set_volume(volume)
+    return sound
 
-    return img_dict
+def sound_loaders(sounds_dir):
+    return {
+        "enemy_hit_sound": lambda assets: _load_sound(sounds_dir / "hit_sound_1.wav", 0.07),
+    }
 
-def load_sounds(sounds_dir):
-    sound_dict = {
-        "enemy_hit_sound": pygame.Sound(sounds_dir / "hit_sound_1.wav")
+def font_loaders(font_dir):
+    return {
+        f"press_start_{size}": lambda assets, size=size: pygame.font.Font(font_dir / "PrStart.ttf", size)
+        for size in (12, 16, 18, 24, 30)
     }
 
-    sound_dict["enemy_hit_sound"].set_volume(0.07)
 
-    return sound_dict
+class SpriteSheet:
+    """Horizontal strip of equally sized animation frames.
+
+    Frames are sliced (and optionally scaled) once per frame size and scale,
+    every caller gets the same tuple of surfaces back.
+    """
+
+    def __init__(self, surface):
+        self.surface = surface
+        self._frames = {}
+
+    def frames(self, frame_width, frame_height, n_frames, scale=None):
+        key = (frame_width, frame_height, n_frames, scale)
+        frames = self._frames.get(key)
+        if frames is None:
+            frames = tuple(
+                self._slice(pygame.Rect(i * frame_width, 0, frame_width, frame_height), scale)
+                for i in range(n_frames)
+            )
+            self._frames[key] = frames
+
+        return frames
+
+    def _slice(self, rect, scale):
+        frame = self.surface.subsurface(rect).copy()
+        if scale is not None:
+            frame = pygame.transform.scale(frame, scale)
+        return frame
 
-def load_fonts(font_dir):
-    font_dict = {
-        "press_start_12": pygame.font.Font(font_dir / "PrStart.ttf", 12),
-        "press_start_16": pygame.font.Font(font_dir / "PrStart.ttf", 16),
-        "press_start_18": pygame.font.Font(font_dir / "PrStart.ttf", 18),
-        "press_start_24": pygame.font.Font(font_dir / "PrStart.ttf", 24),
-        "press_start_30": pygame.font.Font(font_dir / "PrStart.ttf", 30),
-    }
 
-    return font_dict
+_SPRITE_SHEETS = {}
 
+def get_frames(sheet_name, frame_width, frame_height, n_frames, scale=None):
+    sheet = _SPRITE_SHEETS.get(sheet_name)
+    if sheet is None:
+        sheet = SpriteSheet(SPRITE_DICT[sheet_name])
+        _SPRITE_SHEETS[sheet_name] = sheet
 
-print("Loading Sprites")
-SPRITE_DICT = load_images(IMG_DIR)
+    return sheet.frames(frame_width, frame_height, n_frames, scale)
 
-print("Loading Sounds")
-SOUNDS_DICT = load_sounds(SOUNDS_DIR)
+def cached_frames():
+    for sheet in _SPRITE_SHEETS.values():
+        for frames in sheet._frames.values():
+            yield from frames
 
-print("Loading Fonts")
-FONT_DICT = load_fonts(FONT_DIR)
 
+IMAGE_RECIPES = image_recipes(IMG_DIR)
+FLASH_SUFFIX = "_flash"
 
+SPRITE_DICT = AssetRegistry(image_loaders(IMAGE_RECIPES), derive=flash, derived_suffix=FLASH_SUFFIX)
+SOUNDS_DICT = AssetRegistry(sound_loaders(SOUNDS_DIR))
+FONT_DICT = AssetRegistry(font_loaders(FONT_DIR))
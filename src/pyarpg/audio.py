@@ -0,0 +1,101 @@
+import math
+
+import pygame
+
+from pyarpg.assets import SOUNDS_DICT
+
+
+class SoundManager:
+    """Collects sound requests during a frame and plays them in one go.
+
+    request only counts, so it is cheap enough for collision loops. flush
+    plays every requested sound once, louder the more requests were merged
+    (1 + volume_gain * log2(count), capped at max_volume_scale), and only if
+    fewer than max_voices of it are still playing. Sounds passed to reserve
+    play on mixer channels of their own that other sounds never take.
+
+    Merged requests may play louder than a sound was loaded with, so the
+    manager plays its own full volume copy of each sound and sets the
+    loaded volume times the scale on the channel. The shared Sound in the
+    registry keeps its volume for anyone playing it directly.
+    """
+
+    def __init__(self, registry=SOUNDS_DICT, max_voices=4, volume_gain=0.5, max_volume_scale=3.0):
+        self.registry = registry
+        self.max_voices = max_voices
+        self.volume_gain = volume_gain
+        self.max_volume_scale = max_volume_scale
+
+        self.pending = {}
+        self.voices = {}
+        # name -> (own full volume copy, volume name was loaded with)
+        self.sounds = {}
+        self.reserved = {}
+        self._n_reserved = 0
+        self._reserved_applied = 0
+
+    def reserve(self, name, n_channels=1):
+        """Give name n_channels mixer channels of its own."""
+        ids = list(range(self._n_reserved, self._n_reserved + n_channels))
+        self._n_reserved += n_channels
+        self.reserved[name] = ids
+
+    def request(self, name, count=1):
+        self.pending[name] = self.pending.get(name, 0) + count
+
+    def clear(self):
+        self.pending.clear()
+
+    def _sound(self, name):
+        entry = self.sounds.get(name)
+        if entry is None:
+            shared = self.registry[name]
+            entry = (pygame.mixer.Sound(buffer=shared.get_raw()), shared.get_volume())
+            self.sounds[name] = entry
+        return entry
+
+    def _channel(self, name):
+        ids = self.reserved.get(name)
+        if ids is None:
+            return pygame.mixer.find_channel()
+
+        for channel_id in ids:
+            channel = pygame.mixer.Channel(channel_id)
+            if not channel.get_busy():
+                return channel
+        return None
+
+    def volume(self, base_volume, count):
+        scale = min(1 + self.volume_gain * math.log2(count), self.max_volume_scale)
+        return min(1.0, base_volume * scale)
+
+    def flush(self):
+        """Play the sounds requested since the last flush, call once per frame."""
+        if not self.pending:
+            return
+
+        pending = self.pending
+        self.pending = {}
+        if not pygame.mixer.get_init():
+            return
+
+        if self._reserved_applied != self._n_reserved:
+            pygame.mixer.set_reserved(self._n_reserved)
+            self._reserved_applied = self._n_reserved
+
+        for name, count in pending.items():
+            sound, base_volume = self._sound(name)
+
+            # voices that finished or were taken over by another sound are gone
+            voices = [channel for channel in self.voices.get(name, ()) if channel.get_busy() and channel.get_sound() is sound]
+            self.voices[name] = voices
+            if len(voices) >= self.max_voices:
+                continue
+
+            channel = self._channel(name)
+            if channel is None:
+                continue
+
+            channel.play(sound)
+            channel.set_volume(self.volume(base_volume, count))
+            voices.append(channel)
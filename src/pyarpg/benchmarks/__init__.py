@@ -0,0 +1,18 @@
+"""Headless benchmark scenarios with per-phase timings and allocations.
+
+    python -m pyarpg.benchmarks --out results.json
+    python -m pyarpg.benchmarks --save-baseline
+    python -m pyarpg.benchmarks --baseline baseline.json --tolerance 0.2
+
+Every scenario runs with a fixed seed and dt. Timings come from the
+FrameProfiler scopes of the simulation, allocations from a separate
+tracemalloc run. The baseline is benchmark_baseline.json in the working
+directory unless --baseline says otherwise. With a baseline, the exit
+status is 1 when any scenario got slower or allocates more than the
+tolerance allows, and 2 when it was run with another config.
+"""
+from pyarpg.benchmarks.runner import compare
+from pyarpg.benchmarks.runner import run_scenario
+from pyarpg.benchmarks.scenarios import SCENARIOS
+from pyarpg.benchmarks.scenarios import SCENARIOS_BY_NAME
+from pyarpg.benchmarks.scenarios import Scenario
@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import sys
+
+from pyarpg.benchmarks.runner import compare
+from pyarpg.benchmarks.runner import run_scenario
+from pyarpg.benchmarks.scenarios import SCENARIOS
+from pyarpg.benchmarks.scenarios import SCENARIOS_BY_NAME
+
+# timings are machine specific, the baseline stays with whoever runs the benchmarks
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark scenarios headlessly.")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run, all by default: {', '.join(SCENARIOS_BY_NAME)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dt", type=float, default=1 / 60)
+    parser.add_argument("--alloc-ticks", type=int, default=60, help="ticks traced for allocations, 0 skips tracing")
+    parser.add_argument("--batch-steering", action="store_true")
+    parser.add_argument("--batch-projectiles", action="store_true")
+    parser.add_argument("--ai-lod", action="store_true")
+    parser.add_argument("--out", help="write the results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="results JSON to compare against, in the working directory by default")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown over the baseline, 0.2 is 20%%")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS_BY_NAME]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    scenarios = [SCENARIOS_BY_NAME[name] for name in args.scenarios] or SCENARIOS
+
+    options = {
+        "batch_steering": args.batch_steering,
+        "batch_projectiles": args.batch_projectiles,
+        "ai_lod": args.ai_lod,
+    }
+    results = {"config": dict(options, seed=args.seed, dt=args.dt), "scenarios": {}}
+    for scenario in scenarios:
+        result = run_scenario(scenario, seed=args.seed, dt=args.dt, alloc_ticks=args.alloc_ticks, **options)
+        results["scenarios"][scenario.name] = result
+        ms = result["ms_per_tick"]
+        alloc = result.get("alloc")
+        alloc_text = f", peak alloc {alloc['peak_kb']:.0f} KiB" if alloc else ""
+        print(f"{scenario.name:<24} {ms['mean']:8.3f} ms/tick, p99 {ms['p99']:8.3f} ms{alloc_text}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, nothing to compare")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    try:
+        regressions, notes = compare(results, baseline, tolerance=args.tolerance)
+    except ValueError as e:
+        print(f"can't compare with {args.baseline}: {e}")
+        return 2
+
+    for note in notes:
+        print(f"note: {note}")
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
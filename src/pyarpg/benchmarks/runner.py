@@ -0,0 +1,118 @@
+"""Runs scenarios and compares their results against a baseline."""
+import time
+import tracemalloc
+
+from pyarpg.profiler import FrameProfiler
+from pyarpg.sim import LOOT_STORAGE_POS
+from pyarpg.simulation import step
+
+# results keys checked against the baseline, higher is worse for all of them. p99
+# is only reported, a few slow ticks from the OS would fail runs
+CHECKED_METRICS = (("ms_per_tick", "mean"), ("alloc", "peak_kb"))
+
+
+def _outcome(world):
+    return {
+        "enemies_left": len(world.enemies),
+        "loot_count": world.player_stats.loot_count,
+        "player_hp": world.get_player().current_hp,
+    }
+
+
+def _run_ticks(world, drive, n_ticks, dt, profiler=None):
+    for tick in range(n_ticks):
+        if profiler is not None:
+            with profiler.scope("tick"):
+                with profiler.scope("script"):
+                    drive(tick, world)
+                step(world, dt, LOOT_STORAGE_POS)
+                world.sounds.clear()
+            profiler.end_frame()
+        else:
+            drive(tick, world)
+            step(world, dt, LOOT_STORAGE_POS)
+            world.sounds.clear()
+
+
+def time_scenario(scenario, seed=0, dt=1 / 60, warmup_ticks=30, **options):
+    """Per-phase ms over scenario.n_ticks ticks after warmup_ticks untimed ones."""
+    world, drive = scenario.setup(seed, **options)
+    _run_ticks(world, drive, warmup_ticks, dt)
+
+    profiler = FrameProfiler(capacity=scenario.n_ticks, enabled=True)
+    world.profiler = profiler
+    start = time.perf_counter()
+    _run_ticks(world, drive, scenario.n_ticks, dt, profiler)
+    seconds = time.perf_counter() - start
+
+    phases = {}
+    for name in profiler.names:
+        _, mean_ms, p99_ms = profiler.summary(name)
+        phases[name] = {"mean_ms": mean_ms, "p99_ms": p99_ms, "max_ms": max(profiler.history(name)) / 1e6}
+
+    tick = phases.pop("tick")
+    return {
+        "ticks": scenario.n_ticks,
+        "seconds": seconds,
+        "ms_per_tick": {"mean": tick["mean_ms"], "p99": tick["p99_ms"], "max": tick["max_ms"]},
+        "phases": phases,
+        "outcome": _outcome(world),
+    }
+
+
+def measure_allocations(scenario, seed=0, dt=1 / 60, warmup_ticks=30, alloc_ticks=60, **options):
+    """Memory allocated by the ticks themselves, traced in a separate run since tracing slows them down."""
+    world, drive = scenario.setup(seed, **options)
+    _run_ticks(world, drive, warmup_ticks, dt)
+
+    n_ticks = min(alloc_ticks, scenario.n_ticks)
+    tracemalloc.start()
+    try:
+        _run_ticks(world, drive, n_ticks, dt)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # current is what the ticks allocated and kept, peak the high-water mark of it
+    return {"ticks": n_ticks, "peak_kb": peak / 1024, "net_kb": current / 1024}
+
+
+def run_scenario(scenario, seed=0, dt=1 / 60, alloc_ticks=60, **options):
+    result = time_scenario(scenario, seed=seed, dt=dt, **options)
+    if alloc_ticks:
+        result["alloc"] = measure_allocations(scenario, seed=seed, dt=dt, alloc_ticks=alloc_ticks, **options)
+    return result
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Returns (regressions, notes), one line each.
+
+    A metric regresses when it exceeds its baseline value by more than
+    tolerance (0.2 is 20%). A changed outcome only gives a note, gameplay
+    changes are allowed to change what the scenario does. Results run with
+    another config than the baseline can't be compared, that raises
+    ValueError.
+    """
+    if results.get("config") != baseline.get("config"):
+        raise ValueError(f"config {results.get('config')} differs from the baseline's {baseline.get('config')}")
+
+    regressions = []
+    notes = []
+    for name, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            notes.append(f"{name}: not in the baseline")
+            continue
+
+        for group, key in CHECKED_METRICS:
+            value = result.get(group, {}).get(key)
+            base_value = base.get(group, {}).get(key)
+            if value is None or not base_value:
+                continue
+            if value > base_value * (1 + tolerance):
+                regressions.append(f"{name}: {group}.{key} {value:.2f} vs baseline {base_value:.2f} (+{value / base_value - 1:.0%})")
+
+        if result["outcome"] != base.get("outcome"):
+            notes.append(f"{name}: outcome {result['outcome']} differs from baseline {base.get('outcome')}")
+
+    return regressions, notes
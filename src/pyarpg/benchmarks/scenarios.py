@@ -0,0 +1,113 @@
+"""Scripted benchmark scenarios.
+
+A scenario builds a world from a seed and returns it with a driver, called
+as driver(tick, world) before every step the way input is handled in the
+game loop.
+"""
+import math
+
+import pygame
+
+from pyarpg.enemies import RangedEnemy
+from pyarpg.pickups import DropGlobe
+from pyarpg.sim import ScriptedInput
+from pyarpg.sim import WORLD_SIZE
+from pyarpg.sim import build_world
+from pyarpg.skills import RingOfFire
+
+
+class Scenario:
+    def __init__(self, name, setup, n_ticks, description=""):
+        self.name = name
+        self.setup = setup
+        self.n_ticks = n_ticks
+        self.description = description
+
+
+def _random_pos(rng, world):
+    return pygame.Vector2(rng.randint(0, world.max_width), rng.randint(0, world.max_height))
+
+
+def random_enemies(n_enemies, world_size=None):
+    def setup(seed, **options):
+        world, rng = build_world(n_enemies, seed, world_size=world_size, **options)
+        return world, ScriptedInput(rng).apply
+
+    return setup
+
+
+def ring_of_fire_spam(n_enemies=1000, rings_per_tick=2):
+    """Rings of fire dropped at random spots every tick on a crowded map."""
+
+    def setup(seed, **options):
+        world, rng = build_world(n_enemies, seed, **options)
+
+        def drive(tick, world):
+            for _ in range(rings_per_tick):
+                world.add_active_player_ground_skill(RingOfFire.acquire(_random_pos(rng, world)))
+
+        return world, drive
+
+    return setup
+
+
+def projectile_storm(n_enemies=600, min_distance=220, max_distance=380):
+    """Ranged enemies in a ring around a standing player, all of them shooting."""
+
+    def setup(seed, **options):
+        world, rng = build_world(0, seed, **options)
+        center = world.get_player().pos
+        for _ in range(n_enemies):
+            angle = rng.uniform(0, 2 * math.pi)
+            distance = rng.uniform(min_distance, max_distance)
+            world.add_enemy(RangedEnemy(start_pos=center + pygame.Vector2(distance, 0).rotate_rad(angle)))
+
+        # aggro starts on range events, this makes every enemy shoot from the first tick. on_hit
+        # schedules the expiry from aggro_time, so it has to be infinite before
+        for enemy in world.enemies:
+            enemy.aggro_time = math.inf
+            world.aggro.on_hit(enemy, world, propagate=False)
+
+        return world, lambda tick, world: None
+
+    return setup
+
+
+def drop_globe_collection(globes_per_tick=20, near_share=0.5):
+    """A wandering player in a stream of drop globes, about near_share of them dropped within reach."""
+
+    def setup(seed, **options):
+        world, rng = build_world(0, seed, **options)
+        script = ScriptedInput(rng, fireball_every=None, ring_every=None)
+
+        def drive(tick, world):
+            script.apply(tick, world)
+            player_pos = world.get_player().pos
+            for _ in range(globes_per_tick):
+                if rng.random() < near_share:
+                    pos = player_pos + pygame.Vector2(rng.uniform(-40, 40), rng.uniform(-20, 40))
+                else:
+                    pos = _random_pos(rng, world)
+                world.add_pickup(DropGlobe.acquire(pos))
+
+        return world, drive
+
+    return setup
+
+
+SCENARIOS = [
+    Scenario("enemies_100", random_enemies(100), 600, "100 random enemies, scripted player"),
+    Scenario("enemies_1000", random_enemies(1000), 300, "1,000 random enemies, scripted player"),
+    # spread over four screens, at one screen's size they would stand on top of each other
+    Scenario(
+        "enemies_5000",
+        random_enemies(5000, world_size=(2 * WORLD_SIZE[0], 2 * WORLD_SIZE[1])),
+        120,
+        "5,000 random enemies on a 2x2 screen map, scripted player",
+    ),
+    Scenario("ring_of_fire_spam", ring_of_fire_spam(), 300, "two rings of fire per tick on 1,000 enemies"),
+    Scenario("projectile_storm", projectile_storm(), 300, "600 aggro ranged enemies around the player"),
+    Scenario("drop_globe_collection", drop_globe_collection(), 600, "20 drop globes per tick, half of them picked up"),
+]
+
+SCENARIOS_BY_NAME = {scenario.name: scenario for scenario in SCENARIOS}
@@ -0,0 +1,215 @@
+"""Broad-phase collision stage.
+
+Every channel pairs an "a" group with a "b" group, like the two arguments of
+pygame.sprite.groupcollide. CollisionStage.detect sorts the bounding boxes of
+all channels by their left edge once and sweeps them (sweep and prune), only
+comparing boxes of opposite sides of the same channel while their x
+intervals overlap. Candidates whose boxes also overlap on y go through the
+channel's narrow phase, and each channel returns the same
+{a_sprite: [b_sprite, ...]} dict groupcollide would, in group order.
+
+Fast movers (projectiles, the dashing player) keep prev_rect, their rect
+before the last update. The SWEPT narrow phase with swept_bounds tests
+their boxes over the whole move instead of only the end position, so
+nothing tunnels through a target at low tick rates.
+"""
+from operator import attrgetter
+from operator import itemgetter
+
+import pygame
+
+get_rect = attrgetter("rect")
+
+
+def collide_center_in_radius(a, b):
+    """b's rect center lies within a.radius of a.pos, the test of SpatialHash.query_radius."""
+    cx, cy = b.rect.center
+    dx = cx - a.pos[0]
+    dy = cy - a.pos[1]
+    return dx * dx + dy * dy <= a.radius * a.radius
+
+
+def _motion(sprite):
+    prev = getattr(sprite, "prev_rect", None)
+    if prev is None:
+        return 0, 0
+    return sprite.rect.x - prev.x, sprite.rect.y - prev.y
+
+
+def swept_bounds(attr="rect"):
+    """Bounds of the box sprite.<attr> over the sprite's last move."""
+
+    def bounds(sprite):
+        box = getattr(sprite, attr)
+        dx, dy = _motion(sprite)
+        if dx == 0 and dy == 0:
+            return box
+        return box.union(box.move(-dx, -dy))
+
+    return bounds
+
+
+def swept_overlap(a_box, a_motion, b_box, b_motion):
+    """Whether two boxes that moved in a straight line to a_box and b_box overlapped on the way.
+
+    Relative to b, the center of a moved along a segment. The segment is
+    clipped against b grown by a's half size (slab test) with the same
+    strict edges as Rect.colliderect, so the end position alone gives the
+    colliderect answer.
+    """
+    dx = a_motion[0] - b_motion[0]
+    dy = a_motion[1] - b_motion[1]
+    # start center of a relative to b's center, in box halves to stay exact
+    cx = 2 * (a_box.x - b_box.x - dx) + a_box.width - b_box.width
+    cy = 2 * (a_box.y - b_box.y - dy) + a_box.height - b_box.height
+    hx = a_box.width + b_box.width
+    hy = a_box.height + b_box.height
+
+    enter = 0.0
+    exit = 1.0
+    for c, d, h in ((cx, 2 * dx, hx), (cy, 2 * dy, hy)):
+        if d == 0:
+            if not -h < c < h:
+                return False
+            continue
+
+        t0 = (-h - c) / d
+        t1 = (h - c) / d
+        if t0 > t1:
+            t0, t1 = t1, t0
+        enter = max(enter, t0)
+        exit = min(exit, t1)
+
+    return enter < exit
+
+
+def swept_collider(attr_a="rect", attr_b="rect"):
+    """Narrow phase testing sprite.<attr> boxes over both sprites' last moves."""
+
+    def collide(a, b):
+        return swept_overlap(getattr(a, attr_a), _motion(a), getattr(b, attr_b), _motion(b))
+
+    return collide
+
+
+def radius_bounds(sprite):
+    """Box around the circle of sprite.radius at sprite.pos, for circle based narrow phases."""
+    radius = sprite.radius
+    return pygame.Rect(int(sprite.pos[0] - radius) - 1, int(sprite.pos[1] - radius) - 1, 2 * radius + 3, 2 * radius + 3)
+
+
+# narrow phases, None means the bounding boxes overlapping is enough
+RECT = None
+CIRCLE = pygame.sprite.collide_circle
+MASK = pygame.sprite.collide_mask
+CENTER_IN_RADIUS = collide_center_in_radius
+SWEPT = swept_collider()
+
+
+class CollisionChannel:
+    """One pair of groups to collide.
+
+    narrow is None for plain rect overlap or a callable (a, b) -> bool like
+    the collided argument of groupcollide. bounds_a and bounds_b give the
+    rect used in the broad phase, it has to contain everything the narrow
+    phase can report. Sprites failing active_a are skipped, and with
+    dokilla the a sprites that hit something are killed after detection.
+    """
+
+    def __init__(self, name, group_a, group_b, narrow=RECT, bounds_a=get_rect, bounds_b=get_rect, active_a=None, dokilla=False):
+        self.name = name
+        self.group_a = group_a
+        self.group_b = group_b
+        self.narrow = narrow
+        self.bounds_a = bounds_a
+        self.bounds_b = bounds_b
+        self.active_a = active_a
+        self.dokilla = dokilla
+
+
+class CollisionStage:
+    def __init__(self, channels):
+        self.channels = list(channels)
+        self.n_candidates = 0
+
+    def _entries(self):
+        """(left, right, top, bottom, seq, sprite, roles) for every sprite of every live channel."""
+        entries = []
+        # a group shared by several channels (enemies) gets one entry with several roles
+        shared = {}
+
+        for ch_ix, channel in enumerate(self.channels):
+            a_sprites = channel.group_a
+            if channel.active_a is not None:
+                a_sprites = [sprite for sprite in a_sprites if channel.active_a(sprite)]
+            if not a_sprites or not channel.group_b:
+                continue
+
+            for side, sprites, bounds in ((0, a_sprites, channel.bounds_a), (1, channel.group_b, channel.bounds_b)):
+                role = (ch_ix, side)
+                key = (id(channel.group_b), bounds) if side == 1 else None
+                if key is not None and key in shared:
+                    for roles in shared[key]:
+                        roles.append(role)
+                    continue
+
+                group_roles = []
+                for seq, sprite in enumerate(sprites):
+                    rect = bounds(sprite)
+                    roles = [role]
+                    group_roles.append(roles)
+                    entries.append((rect.left, rect.right, rect.top, rect.bottom, seq, sprite, roles))
+
+                if key is not None:
+                    shared[key] = group_roles
+
+        return entries
+
+    def _candidates(self, entries):
+        """Sweep entries by left edge, yields (channel index, a entry, b entry) with overlapping boxes."""
+        entries.sort(key=itemgetter(0))
+        active = [([], []) for _ in self.channels]
+
+        for entry in entries:
+            left, _, top, bottom = entry[:4]
+            for ch_ix, side in entry[6]:
+                sides = active[ch_ix]
+                others = sides[1 - side]
+
+                # prune boxes that ended left of this one, they cannot overlap anything later
+                kept = [other for other in others if other[1] > left]
+                if len(kept) != len(others):
+                    others[:] = kept
+
+                for other in kept:
+                    if other[2] < bottom and top < other[3]:
+                        yield (ch_ix, entry, other) if side == 0 else (ch_ix, other, entry)
+
+                sides[side].append(entry)
+
+    def detect(self):
+        """Returns {channel name: {a_sprite: [b_sprite, ...]}} for all channels."""
+        pairs = [[] for _ in self.channels]
+        n_candidates = 0
+        for ch_ix, a, b in self._candidates(self._entries()):
+            n_candidates += 1
+            narrow = self.channels[ch_ix].narrow
+            if narrow is None or narrow(a[5], b[5]):
+                pairs[ch_ix].append((a[4], b[4], a[5], b[5]))
+        self.n_candidates = n_candidates
+
+        results = {}
+        for channel, channel_pairs in zip(self.channels, pairs):
+            # back to group order, the way groupcollide iterates
+            channel_pairs.sort(key=itemgetter(0, 1))
+            hits = {}
+            for _, _, a, b in channel_pairs:
+                hits.setdefault(a, []).append(b)
+
+            if channel.dokilla:
+                for a in hits:
+                    a.kill()
+
+            results[channel.name] = hits
+
+        return results
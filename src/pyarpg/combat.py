@@ -0,0 +1,71 @@
+"""Per-tick combat resolution.
+
+Collision handling only records hits in a CombatQueue. resolve merges them
+and applies damage, deaths, loot drops and hit feedback in one pass at the
+end of the tick, and returns a CombatLog that audio and UI read instead of
+reacting to every single hit.
+"""
+
+
+class CombatLog:
+    """What one CombatQueue.resolve did.
+
+    hits holds one (target, damage) pair per damaged target, in the order
+    the targets were first hit, kills the targets that died.
+    """
+
+    def __init__(self):
+        self.hits = []
+        self.kills = []
+
+    def __len__(self):
+        return len(self.hits)
+
+    def sound_requests(self):
+        """{sound name: count} for the hits, targets name their sound in hit_sound."""
+        counts = {}
+        for target, _ in self.hits:
+            name = target.hit_sound
+            if name is not None:
+                counts[name] = counts.get(name, 0) + 1
+        return counts
+
+
+class CombatQueue:
+    """Hits recorded during a tick, merged per target and source.
+
+    A source reported hitting the same target more than once counts once,
+    with its largest damage. Damage from different sources adds up, and
+    the target takes the sum in a single apply_damage(damage, world) call,
+    so it dies and drops its loot at most once per tick.
+    """
+
+    def __init__(self):
+        self.pending = {}
+
+    def __len__(self):
+        return len(self.pending)
+
+    def hit(self, target, damage, source):
+        sources = self.pending.get(target)
+        if sources is None:
+            self.pending[target] = {source: damage}
+        elif damage > sources.get(source, 0):
+            sources[source] = damage
+
+    def clear(self):
+        self.pending.clear()
+
+    def resolve(self, world):
+        """Apply the recorded hits and return the CombatLog."""
+        pending = self.pending
+        self.pending = {}
+
+        log = CombatLog()
+        for target, sources in pending.items():
+            damage = sum(sources.values())
+            log.hits.append((target, damage))
+            if target.apply_damage(damage, world):
+                log.kills.append(target)
+
+        return log
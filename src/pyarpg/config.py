@@ -4,4 +4,5 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 ASSETS_DIR = BASE_DIR / "assets"
 IMG_DIR = ASSETS_DIR / "images"
 SOUNDS_DIR = ASSETS_DIR / "sounds"
-FONT_DIR = ASSETS_DIR / "fonts"
\ No newline at end of file
+FONT_DIR = ASSETS_DIR / "fonts"
+CACHE_DIR = ASSETS_DIR / "cache"
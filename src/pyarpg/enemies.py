@@ -1,12 +1,197 @@
 import math
+import time
 import pygame
 from pyarpg.assets import SPRITE_DICT
-from pyarpg.assets import SOUNDS_DICT
 from pyarpg.skills import FireballProjectile
 from pyarpg.skills import ShortFireballProjectile
 from pyarpg.pickups import DropGlobe
 
+# hit feedback tables are baked per (image, flash image) pair and shared by
+# every enemy using that pair
+_HIT_FEEDBACK_FRAMES = {}
+
+def get_hit_feedback_frames(image, flash_image, n_steps=10, max_zoom=0.12, flash_until=0.6):
+    """Hit feedback curve sampled at the middle of n_steps equal time slices."""
+    key = (image, flash_image, n_steps, max_zoom, flash_until)
+    frames = _HIT_FEEDBACK_FRAMES.get(key)
+    if frames is not None:
+        return frames
+
+    frames = []
+    for i in range(n_steps):
+        t = (i + 0.5) / n_steps
+
+        # zoom curve: up then back (sine)
+        zoom = 1.0 + math.sin(t * math.pi) * max_zoom
+        src = flash_image if t < flash_until else image
+
+        w = max(1, int(src.get_width() * zoom))
+        h = max(1, int(src.get_height() * zoom))
+
+        # for pixel art use pygame.transform.scale instead
+        frames.append(pygame.transform.scale(src, (w, h)))
+
+    frames = tuple(frames)
+    _HIT_FEEDBACK_FRAMES[key] = frames
+    return frames
+
+def cached_hit_feedback_frames():
+    for frames in _HIT_FEEDBACK_FRAMES.values():
+        yield from frames
+
+class AIScheduler:
+    """Runs enemy updates at a rate that depends on how much they matter.
+
+    Enemies are sorted into tiers, each with an update interval in ticks:
+    aggro enemies within near_radius of the player (or playing hit
+    feedback) update every tick, aggro enemies further away, idle enemies
+    near the player and idle enemies far away update less often. Within a
+    tier enemies are spread round-robin over the interval's phases, so each
+    tick runs the same share of them. An update gets the time since the
+    enemy's previous one as dt, and the tier is re-evaluated after it.
+
+    The every-tick tier always runs. The rest stops once budget_ms is spent
+    in a tick, the skipped enemies go first in the next tick. With
+    budget_ms=None nothing is skipped and runs stay deterministic.
+
+    Attach to an enemy SpatialGroup with add_index.
+    """
+
+    AGGRO_NEAR, AGGRO_FAR, IDLE_NEAR, IDLE_FAR = range(4)
+
+    def __init__(self, near_radius=600, intervals=(1, 2, 4, 8), budget_ms=4.0):
+        self.near_radius = near_radius
+        self.intervals = intervals
+        self.budget_ms = budget_ms
+
+        self.time = 0.0
+        self.tick = 0
+        # tier -> phase -> insertion-ordered set of enemies
+        self.buckets = [[{} for _ in range(interval)] for interval in intervals]
+        self.slots = {}
+        self.last_update = {}
+        self._next_phase = [0] * len(intervals)
+        self.deferred = {}
+        self.n_deferred = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _place(self, enemy, tier):
+        phase = self._next_phase[tier]
+        self._next_phase[tier] = (phase + 1) % self.intervals[tier]
+        self.buckets[tier][phase][enemy] = None
+        self.slots[enemy] = (tier, phase)
+
+    def _unplace(self, enemy):
+        tier, phase = self.slots.pop(enemy)
+        del self.buckets[tier][phase][enemy]
+
+    def insert(self, enemy):
+        # new enemies start far and idle, their first update sorts them in
+        self._place(enemy, self.IDLE_FAR)
+        self.last_update[enemy] = self.time
+
+    def remove(self, enemy):
+        if enemy not in self.slots:
+            return
+        self._unplace(enemy)
+        del self.last_update[enemy]
+        self.deferred.pop(enemy, None)
+
+    def wake(self, enemy):
+        """Move enemy to the every-tick tier, e.g. when it pulls aggro or is hit."""
+        slot = self.slots.get(enemy)
+        if slot is None or slot[0] == self.AGGRO_NEAR:
+            return
+        self._unplace(enemy)
+        self._place(enemy, self.AGGRO_NEAR)
+
+    def next_phases(self):
+        """Phase the next enemy placed in each tier gets."""
+        return list(self._next_phase)
+
+    def bucket_ranks(self):
+        """{enemy: position in its (tier, phase) bucket}, buckets run in this order."""
+        return {enemy: rank for tier in self.buckets for bucket in tier for rank, enemy in enumerate(bucket)}
+
+    def restore(self, time, tick, intervals, next_phases, placed, deferred):
+        """Replace the schedule with a saved one, see snapshot.restore.
+
+        placed holds (enemy, tier, phase, last_update) in bucket order,
+        deferred the enemies skipped in the last tick in their order.
+        """
+        self.time = time
+        self.tick = tick
+        self.intervals = tuple(intervals)
+        self._next_phase = list(next_phases)
+        self.buckets = [[{} for _ in range(interval)] for interval in self.intervals]
+        self.slots = {}
+        self.last_update = {}
+        for enemy, tier, phase, last_update in placed:
+            self.buckets[tier][phase][enemy] = None
+            self.slots[enemy] = (tier, phase)
+            self.last_update[enemy] = last_update
+        self.deferred = dict.fromkeys(deferred)
+        self.n_deferred = len(self.deferred)
+
+    def _tier(self, enemy, player_pos):
+        dx = enemy.pos[0] - player_pos[0]
+        dy = enemy.pos[1] - player_pos[1]
+        near = dx * dx + dy * dy <= self.near_radius * self.near_radius
+
+        if enemy.is_aggro:
+            return self.AGGRO_NEAR if near else self.AGGRO_FAR
+        if enemy.play_damage_feedback:
+            return self.AGGRO_NEAR
+        return self.IDLE_NEAR if near else self.IDLE_FAR
+
+    def _run(self, enemy, world, player_pos):
+        enemy.update(self.time - self.last_update[enemy], world)
+        self.last_update[enemy] = self.time
+
+        # the update may have killed the enemy and removed it from here
+        slot = self.slots.get(enemy)
+        if slot is None:
+            return
+
+        tier = self._tier(enemy, player_pos)
+        if slot[0] != tier:
+            self._unplace(enemy)
+            self._place(enemy, tier)
+
+    def update(self, dt, world):
+        self.time += dt
+        self.tick += 1
+        player_pos = world.get_player().pos
+
+        for enemy in list(self.buckets[self.AGGRO_NEAR][0]):
+            self._run(enemy, world, player_pos)
+
+        # enemies skipped last tick first, then the due phase of every other tier
+        due = list(self.deferred)
+        for tier in range(1, len(self.intervals)):
+            due.extend(self.buckets[tier][self.tick % self.intervals[tier]])
+        self.deferred = {}
+
+        deadline = None
+        if self.budget_ms is not None:
+            deadline = time.perf_counter() + self.budget_ms / 1000
+
+        for ix, enemy in enumerate(due):
+            if deadline is not None and time.perf_counter() > deadline:
+                self.deferred = dict.fromkeys(due[ix:])
+                break
+            # gone, or already updated this tick after a wake
+            if enemy in self.slots and self.last_update[enemy] != self.time:
+                self._run(enemy, world, player_pos)
+
+        self.n_deferred = len(self.deferred)
+
+
 class _BaseEnemy(pygame.sprite.Sprite):
+    hit_sound = "enemy_hit_sound"
+
     def __init__(
             self,
             image,
@@ -14,6 +199,7 @@ class _BaseEnemy(pygame.sprite.Sprite):
             start_pos,
             max_hp=100,
             attack=None,
+            attack_damage=10,
             aggro_range=300,
             aggro_time=3,
             atk_speed=0.5,
@@ -36,11 +222,14 @@ class _BaseEnemy(pygame.sprite.Sprite):
         self.play_damage_feedback = False
         self.hit_fx_time = 0.0
         self.hit_fx_duration = 0.10  # seconds 
+        self.hit_fx_frames = get_hit_feedback_frames(image, flash_image)
 
         self.time_since_last_attack = 1000
 
         # enemy stats
         self.attack = attack
+        # the enemy's own, the attack's class damage is what the player's skill of that class does
+        self.attack_damage = attack_damage
         self.aggro_range = aggro_range
         self.aggro_time = aggro_time
         self.atk_speed = atk_speed
@@ -49,8 +238,8 @@ class _BaseEnemy(pygame.sprite.Sprite):
         self.min_distance_to_player = min_distance_to_player
         self.max_distance_to_player = max_distance_to_player
 
+        # switched on and off by World.aggro
         self.is_aggro = False
-        self.remaining_aggro_duration = 0
 
     @property
     def hp_percent(self):
@@ -60,51 +249,36 @@ class _BaseEnemy(pygame.sprite.Sprite):
     def cooldown_time(self):
         return 1 / self.atk_speed
     
-    def grid_bucket_ix(self, grid_size, n_rows):
-        col_ix = self.pos[0] // grid_size
-        row_ix = self.pos[1] // grid_size
-
-        return col_ix * n_rows + row_ix
-
-
-    def take_damage(self, n_dmg, world):
-        SOUNDS_DICT["enemy_hit_sound"].play()
-        self.is_aggro = True
-        self.remaining_aggro_duration = self.aggro_time
+    def apply_damage(self, n_dmg, world):
+        """Damage, feedback and death, the hit sound is requested from the CombatLog."""
+        world.aggro.on_hit(self, world)
         new_hp = self.current_hp - n_dmg
         self.current_hp = max(0, new_hp)
 
         # trigger feedback
         self.hit_fx_time = self.hit_fx_duration
         self.play_damage_feedback = True
+        if world.ai is not None:
+            world.ai.wake(self)
 
         if self.current_hp <= 0:
-            world.add_pickup(DropGlobe(self.rect.center))
+            world.add_pickup(DropGlobe.acquire(self.rect.center))
             self.kill()
             return True
 
         return False
     
-    def _set_aggro(self, player_pos):
-        distance = (self.rect.center - player_pos).length()
-
-        if distance <= self.aggro_range:
-            self.is_aggro = True
-            self.remaining_aggro_duration = self.aggro_time
-
-        if self.remaining_aggro_duration <= 0:
-            self.is_aggro = False
-
     def update(self, dt, world):
-        self._set_aggro(world.get_player().pos)
-
         if self.is_aggro:
             self._launch_attack(dt, world)
-            self._move_into_player_range(dt, world)
-            self.remaining_aggro_duration -= dt
+            if world.steering is None:
+                self._move_into_player_range(dt, world)
 
         if self.play_damage_feedback:
             self._damage_feedback(dt)
+            # the feedback frames change the rect's size, which bounds the batch's clamping
+            if world.steering is not None:
+                world.steering.sync(self)
 
     def _update_pos(self, new_pos, world):
         max_w = world.max_width - self.rect.width // 2
@@ -126,7 +300,7 @@ class _BaseEnemy(pygame.sprite.Sprite):
 
         self.pos = new_pos
         self.rect.center = new_pos
-
+        world.enemies.update_position(self)
 
 
     def _move_into_player_range(self, dt, world):
@@ -179,28 +353,20 @@ class _BaseEnemy(pygame.sprite.Sprite):
 
         if dist < self.attack.target_range:
             self.time_since_last_attack = 0
-            world.add_active_enemy_skill(self.attack(self.rect.center, world.get_player().pos))
+            world.launch_enemy_projectile(self.attack, self.rect.center, world.get_player().pos, damage=self.attack_damage)
         
     def _damage_feedback(self, dt):
         if self.hit_fx_time > 0:
             self.hit_fx_time = max(0.0, self.hit_fx_time - dt)
             t = 1.0 - (self.hit_fx_time / self.hit_fx_duration)  # 0..1
 
-            # zoom curve: up then back (sine)
-            zoom = 1.0 + math.sin(t * math.pi) * 0.12
-
-            # choose flash half the time (or entire time if you want)
-            use_flash = t < 0.6
-            src = self.flash_image if use_flash else self.base_image
-
-            # scale around center
-            center = self.rect.center
-            w = max(1, int(src.get_width() * zoom))
-            h = max(1, int(src.get_height() * zoom))
-
-            # for pixel art use pygame.transform.scale instead
-            self.image = pygame.transform.scale(src, (w, h))
-            self.rect = self.image.get_rect(center=center)
+            # pre-baked zoom/flash curve, only swap when the slice changes
+            frames = self.hit_fx_frames
+            image = frames[min(int(t * len(frames)), len(frames) - 1)]
+            if image is not self.image:
+                center = self.rect.center
+                self.image = image
+                self.rect = self.image.get_rect(center=center)
         else:
             self.play_damage_feedback = False
             # restore
@@ -212,7 +378,8 @@ class _BaseEnemy(pygame.sprite.Sprite):
     
     def _separation_vec(self, world, radius=40, strength=1.0, edge_margin=60, edge_strength=1.0):
         """Boids-style separation + soft screen-edge avoidance."""
-        neighbors = world.enemies
+        # rect centers are rounded, so pad the grid query by a pixel
+        neighbors = world.get_enemies_in_radius(self.pos, radius + 1)
         r2 = radius * radius
 
         sep = pygame.Vector2(0, 0)
@@ -281,6 +448,7 @@ class RangedEnemy(_BaseEnemy):
             flash_image=SPRITE_DICT["dummy_flash"],
             start_pos=start_pos,
             attack=FireballProjectile,
+            attack_damage=15,
             min_distance_to_player=200,
             max_distance_to_player=FireballProjectile.target_range - 5 
         )
@@ -292,6 +460,7 @@ class MeleeEnemy(_BaseEnemy):
             flash_image=SPRITE_DICT["melee_flash"],
             start_pos=start_pos,
             attack=ShortFireballProjectile,
+            attack_damage=15,
             min_distance_to_player=5,
             max_distance_to_player=30
         )
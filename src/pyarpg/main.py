@@ -2,31 +2,90 @@ import pygame
 from pygame import Vector2
 import math
 
-init_size = (1600, 900)
-pygame.init()
-pygame.display.set_caption("PyARPG")
-real_screen = pygame.display.set_mode(init_size, pygame.RESIZABLE)
-screen = pygame.Surface(init_size)
-
 from pyarpg.assets import SPRITE_DICT
-from pyarpg.assets import SOUNDS_DICT
 from pyarpg.world import World
 from pyarpg.level import spawn_random_enemies
 from pyarpg.skills import FireballProjectile
 from pyarpg.skills import BlueCircleAOESkill
 from pyarpg.skills import RingOfFire
-from pyarpg.ui import draw_enemy_hp_bars
+from pyarpg.ui import EnemyHPBarRenderer
 from pyarpg.player import Player
 from pyarpg.pickups import DropGlobe
 from pyarpg.ui import BottomUIBar
 from pyarpg.stats import PlayerStats
 from pyarpg.portals import Portal
-import cProfile, pstats
+from pyarpg.simulation import step
+from pyarpg.scenes import MonsterScene
+from pyarpg.render import RenderQueue
+from pyarpg.render import SceneRenderer
+from pyarpg.render import DirtyRectRenderer
+from pyarpg.render import collect_shared_surfaces
+from pyarpg.timestep import FixedTimestep
+from pyarpg.timestep import PositionHistory
+from pyarpg.profiler import ProfilerOverlay
+from pyarpg.replay import KEY
+from pyarpg.replay import MOVE
+from pyarpg.replay import InputRecorder
+from pyarpg.replay import InputReplay
+from pyarpg.replay import ReplayConfig
+import argparse
+import random
+
+
+def seed_arg(text):
+    # recordings store the seed as an unsigned 64 bit integer
+    seed = int(text)
+    if not 0 <= seed < 2**64:
+        raise argparse.ArgumentTypeError(f"seed must be between 0 and 2**64 - 1, got {seed}")
+    return seed
+
+
+parser = argparse.ArgumentParser(description="PyARPG")
+parser.add_argument("--dirty-rects", action="store_true", help="only redraw and push the areas that changed")
+parser.add_argument("--world-screens", type=int, default=1, help="world width and height in screens")
+parser.add_argument("--enemies", type=int, default=0, help="number of random enemies to spawn")
+parser.add_argument("--batch-projectiles", action="store_true", help="keep projectiles in numpy arrays instead of sprites")
+parser.add_argument("--ai-lod", action="store_true", help="update far and idle enemies less often")
+parser.add_argument("--max-fps", type=int, default=144, help="frame rate cap, the simulation runs at --tick-rate regardless")
+parser.add_argument("--tick-rate", type=int, default=60, help="simulation ticks per second")
+parser.add_argument("--max-catch-up", type=int, default=5, help="most ticks run in one frame before the game slows down")
+parser.add_argument("--no-interpolation", action="store_true", help="draw the latest tick instead of blending two")
+parser.add_argument("--profile", action="store_true", help="time each system from the start and show the overlay, F3 toggles it later")
+parser.add_argument("--profile-out", default="profile", help="path prefix of the .csv and .json traces F4 writes")
+parser.add_argument("--seed", type=seed_arg, default=None, help="enemy spawn seed, random by default")
+parser.add_argument("--record", metavar="PATH", help="record the seed, ticks and input to PATH")
+parser.add_argument("--replay", metavar="PATH", help="play back a recording instead of reading input")
+args = parser.parse_args()
+
+# a replay brings the settings its world was built with
+replay = None
+if args.replay:
+    replay = InputReplay(args.replay)
+    config = replay.config
+    args.enemies = config.n_enemies
+    args.world_screens = config.world_screens
+    args.tick_rate = round(1 / config.tick_dt)
+    args.batch_projectiles = config.batch_projectiles
+    args.ai_lod = config.ai_lod
+    seed = config.seed
+else:
+    seed = args.seed if args.seed is not None else random.randrange(2**63)
+
+init_size = (1600, 900)
+pygame.init()
+pygame.display.set_caption("PyARPG")
+real_screen = pygame.display.set_mode(init_size, pygame.RESIZABLE)
+screen = pygame.Surface(init_size)
 
-profiler = cProfile.Profile()
-profiler.enable()
+# assets load on first use, warm the ones this scene needs now that
+# images can be converted for the display
+MonsterScene.prefetch_assets()
 
+# sprites draw from atlas pages, one blits call per flush
+render_queue = RenderQueue()
+render_queue.atlas.add_many(collect_shared_surfaces())
 
+TREE_POSITIONS = [(1000, 240), (300, 190), (800, 600)]
 
 BG_COLOR = (45, 64, 54) #(45, 64, 47)#(48, 47, 61)
 screen.fill(BG_COLOR)
@@ -34,12 +93,24 @@ screen.fill(BG_COLOR)
 clock = pygame.time.Clock()
 running = True
 ui_bar = BottomUIBar(*init_size)
+hp_bars = EnemyHPBarRenderer()
 
-world = World(screen, PlayerStats())
+world = World(
+    screen,
+    PlayerStats(),
+    world_size=(init_size[0] * args.world_screens, init_size[1] * args.world_screens),
+    batch_projectiles=args.batch_projectiles,
+    ai_lod=args.ai_lod,
+)
+MonsterScene.reserve_channels(world.sounds)
+if world.ai is not None and (args.record or replay is not None):
+    # a time budget would defer different enemies on every run
+    world.ai.budget_ms = None
 
 
 player = Player(pos=(500, 400))
 world.add_player(player)
+world.camera.follow(player.pos)
 
 button_to_skill = {
     pygame.K_q: FireballProjectile
@@ -49,140 +120,185 @@ button_to_ground_skill = {
     pygame.K_w: RingOfFire
 }
 
-#spawn_random_enemies(world, n_enemies=100)
-"""
-cell_size = 64
-n_grid_cols = math.ceil(init_size[0] / cell_size)
-n_grid_rows = math.ceil(init_size[1] / cell_size)
-print("Grid Size:", (n_grid_rows, n_grid_cols))
-spatial_grid = [
-    {
-        "enemy": [],
-    }
-    for _ in range(n_grid_rows * n_grid_cols)
-]
-
-def _transform_to_grid_index(col_ix, row_ix, n_rows):
-    return col_ix * n_rows + row_ix
-
-def gen_relevant_indices(col_ix, row_ix, max_col, max_row):
-    nbors = set()
-    for col_offset in (-1, 0, 1):
-        for row_offset in (-1, 0, 1):
-            col_ = min(max(0, col_ix + col_offset), max_col)
-            row_ = min(max(0, row_ix + row_offset), max_row)
-            nbors.add(col_)
-    
-    return (_transform_to_grid_index(c, r) for c_r in nbors)
-
-grid_ix_to_neighboring_indices = [
-    f??
-]
-"""
+spawn_random_enemies(world, n_enemies=args.enemies, rng=random.Random(seed))
+
+
+def handle_key(key, aimed_target_pos):
+    skill = button_to_skill.get(key)
+    if skill is not None:
+        world.launch_player_projectile(skill, player.pos, aimed_target_pos)
+
+    skill = button_to_ground_skill.get(key)
+    if skill is not None:
+        world.add_active_player_ground_skill(skill.acquire(aimed_target_pos))
+
+    if key == pygame.K_SPACE:
+        player.set_dash_target(aimed_target_pos)
+
+
+# keys that change the simulation, the only ones recorded
+GAME_KEYS = set(button_to_skill) | set(button_to_ground_skill) | {pygame.K_SPACE}
+
 
 def inverse_scale_mouse_pos(mx, my):
     mx, my = pygame.mouse.get_pos()
     vw, vh = init_size
     ww, wh = real_screen.get_size()
-    return pygame.Vector2(mx * vw / ww, my * vh / wh)
+    return world.camera.screen_to_world((mx * vw / ww, my * vh / wh))
 
 portal = Portal(pygame.Vector2(70, init_size[1] // 2 + 20))
+
+# the simulation runs at a fixed rate, frames draw in between ticks
+timestep = FixedTimestep(tick_rate=args.tick_rate, max_ticks_per_frame=args.max_catch_up)
+history = None if args.no_interpolation else PositionHistory()
+
+recorder = None
+if args.record:
+    recorder = InputRecorder(
+        args.record,
+        ReplayConfig(
+            seed,
+            n_enemies=args.enemies,
+            world_screens=args.world_screens,
+            tick_dt=timestep.tick_dt,
+            batch_projectiles=args.batch_projectiles,
+            ai_lod=args.ai_lod,
+        ),
+    )
+
+renderer_cls = DirtyRectRenderer if args.dirty_rects else SceneRenderer
+renderer = renderer_cls(
+    world,
+    render_queue,
+    hp_bars,
+    ui_bar,
+    portal,
+    decorations=[(SPRITE_DICT["tree1"], tree_pos) for tree_pos in TREE_POSITIONS],
+    bg_color=BG_COLOR,
+    history=history,
+)
+
+# per-system timings, drawn on the window so they never end up in the scene
+profiler = world.profiler
+profiler.enabled = args.profile
+profile_overlay = ProfilerOverlay(profiler)
+profile_overlay.visible = args.profile
+overlay_rect = None
+
 slow_mo = 5
 while running:
     aimed_target_pos = inverse_scale_mouse_pos(*pygame.mouse.get_pos())
 
-    dt = clock.tick(300) / 1000.0 / max(slow_mo, 1)
-    slow_mo -= (dt * 15)
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
-            player.set_target_pos(inverse_scale_mouse_pos(*pygame.mouse.get_pos()))
-
-        elif event.type == pygame.KEYDOWN:
-            skill = button_to_skill.get(event.key)
-            if skill is not None:
-                world.add_active_player_skill(skill(player.pos, aimed_target_pos))
-
-            skill = button_to_ground_skill.get(event.key)
-            if skill is not None:
-                world.add_active_player_ground_skill(skill(aimed_target_pos))
-
-            if event.key == pygame.K_SPACE:
-                player.set_dash_target(aimed_target_pos)
-
-        elif event.type == pygame.VIDEORESIZE:
-            # Recreate the window at the new size
-            real_screen = pygame.display.set_mode(
-                (event.w, event.h),
-                pygame.RESIZABLE
-            )
-
-    if pygame.mouse.get_pressed()[2]:
-        player.set_target_pos(aimed_target_pos)
-
-    portal.update(dt, world)
-    world.players.update(dt, world)
-    world.active_player_skills.update(dt, world)
-    world.active_player_ground_skills.update(dt, world)
-    world.enemies.update(dt, world)
-    world.active_enemy_skills.update(dt, world)
-    world.pickups_waiting.update(dt, world)
-    world.pickups_collected.update(dt, world)
-    ui_bar.update(dt, world)
-
-    hits = pygame.sprite.groupcollide(world.active_player_skills, world.enemies, dokilla=True, dokillb=False)
-    for projectile, hit_enemies in hits.items():
-        for enemy in hit_enemies:
-            enemies_dies = enemy.take_damage(projectile.damage, world)
-
-    hits = pygame.sprite.groupcollide(world.active_enemy_skills, world.players, dokilla=True, dokillb=False)
-    for attack, hit_players in hits.items():
-        for player_ in hit_players:
-            player_.take_damage(attack.damage)
-            print(player.current_hp)
-    
-    for pickup in world.pickups_waiting:
-        if player.pickup_rect.colliderect(pickup.rect):
-            pickup.collect(*ui_bar.loot_count_pos.center)
-            world.pickups_waiting.remove(pickup)
-            world.pickups_collected.add(pickup)
-
-
-    for ground_skill in world.active_player_ground_skills:
-        for enemy in ground_skill.get_collisions(world.enemies):
-            enemy.take_damage(ground_skill.damage, world)
-            
-    screen.fill(BG_COLOR)
-    screen.blit(portal.image, portal.rect)
-    world.active_player_ground_skills.draw(screen)
-    world.pickups_waiting.draw(screen)
-    world.enemies.draw(screen)
-    world.players.draw(screen)
-    world.active_enemy_skills.draw(screen)
-    world.active_player_skills.draw(screen)
-    draw_enemy_hp_bars(world, screen)
-    ui_bar.draw(screen)
-    world.pickups_collected.draw(screen)
-    
-    screen.blit(SPRITE_DICT["tree1"], (1000, 240))
-    screen.blit(SPRITE_DICT["tree1"], (300, 190))
-    screen.blit(SPRITE_DICT["tree1"], (800, 600))
-
-    # fps
-    #screen.blit(text_surface, (0,0))
+    # slow motion stretches game time, the tick length stays the same
+    frame_dt = clock.tick(args.max_fps) / 1000.0 / max(slow_mo, 1)
+    slow_mo -= (frame_dt * 15)
+    with profiler.scope("input"):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3 and replay is None:
+                target_pos = inverse_scale_mouse_pos(*pygame.mouse.get_pos())
+                player.set_target_pos(target_pos)
+                if recorder is not None:
+                    recorder.move(target_pos)
+
+            elif event.type == pygame.KEYDOWN:
+                if event.key in GAME_KEYS and replay is None:
+                    handle_key(event.key, aimed_target_pos)
+                    if recorder is not None:
+                        recorder.key(event.key, aimed_target_pos)
+
+                if event.key == pygame.K_F3:
+                    profile_overlay.toggle()
+                    profiler.enabled = profiler.enabled or profile_overlay.visible
+
+                if event.key == pygame.K_F4 and profiler.n_frames:
+                    profiler.dump_csv(f"{args.profile_out}.csv")
+                    profiler.dump_json(f"{args.profile_out}.json")
+
+            elif event.type == pygame.VIDEORESIZE:
+                # Recreate the window at the new size
+                real_screen = pygame.display.set_mode(
+                    (event.w, event.h),
+                    pygame.RESIZABLE
+                )
+                renderer.invalidate()
+
+        if pygame.mouse.get_pressed()[2] and replay is None:
+            player.set_target_pos(aimed_target_pos)
+            if recorder is not None:
+                recorder.move(aimed_target_pos)
+
+    dt = timestep.tick_dt
+    for _ in range(timestep.advance(frame_dt)):
+        if replay is not None:
+            if replay.finished:
+                running = False
+                break
+
+            # recorded input goes in right before the tick it preceded
+            dt, events = replay.next_tick()
+            for kind, key, x, y in events:
+                if kind == MOVE:
+                    player.set_target_pos(Vector2(x, y))
+                elif kind == KEY:
+                    handle_key(key, Vector2(x, y))
+
+        if recorder is not None:
+            recorder.tick(dt)
+        if history is not None:
+            history.record(world)
+        portal.update(dt, world)
+        step(world, dt, ui_bar.loot_count_pos.center)
+        hp_bars.record(world.combat_log, world.enemies)
+        world.camera.follow(player.pos)
+        ui_bar.update(dt, world)
+
+    if history is not None:
+        history.alpha = timestep.alpha
+
+    with profiler.scope("sounds"):
+        world.sounds.flush()
+
+    with profiler.scope("draw"):
+        dirty_rects = renderer.draw(screen)
+
+    # the overlay sits on the window, the area it covered last frame comes back from screen
+    profile_overlay.update(frame_dt)
     if screen.get_size() != real_screen.get_size():
-        scaled = pygame.transform.scale(screen, real_screen.get_size())
+        with profiler.scope("scale"):
+            scaled = pygame.transform.scale(screen, real_screen.get_size())
+            real_screen.blit(scaled, (0, 0))
+        overlay_rect = profile_overlay.draw(real_screen)
+        with profiler.scope("flip"):
+            pygame.display.flip()
+    elif dirty_rects is None:
+        real_screen.blit(screen, (0, 0))
+        overlay_rect = profile_overlay.draw(real_screen)
+        with profiler.scope("flip"):
+            pygame.display.flip()
     else:
-        scaled = screen
-
-    real_screen.blit(scaled, (0, 0))
-    pygame.display.flip()
-
-profiler.disable()
-
-stats = pstats.Stats(profiler).sort_stats('cumtime')
-stats.print_stats(20)  # top 20 slowest calls
+        if overlay_rect is not None:
+            dirty_rects.append(overlay_rect)
+        real_screen.blits([(screen, rect, rect) for rect in dirty_rects], doreturn=False)
+        overlay_rect = profile_overlay.draw(real_screen)
+        if overlay_rect is not None:
+            dirty_rects.append(overlay_rect)
+        with profiler.scope("flip"):
+            pygame.display.update(dirty_rects)
+
+    profiler.end_frame()
+
+if recorder is not None:
+    recorder.close()
+
+# compare these lines of a recording and its replay to check they ran the same fight
+if recorder is not None or replay is not None:
+    n_ticks = recorder.n_ticks if recorder is not None else replay.n_ticks
+    print(
+        f"{n_ticks} ticks, seed {seed}: enemies left: {len(world.enemies)}, "
+        f"loot: {world.player_stats.loot_count}, player hp: {player.current_hp}"
+    )
 
 pygame.quit()
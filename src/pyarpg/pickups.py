@@ -1,25 +1,21 @@
 import pygame
 
-from pyarpg.assets import SPRITE_DICT
+from pyarpg.assets import get_frames
+from pyarpg.pooling import PooledSprite
+from pyarpg.pooling import pooled
 
 
-class DropGlobe(pygame.sprite.Sprite):
-    def __init__(self, pos):
-        super().__init__()
+@pooled(capacity=512)
+class DropGlobe(PooledSprite):
+    loot_value = 1
 
-        self.loot_value = 1
+    def reset(self, pos):
         self.width_per_frame = 22
         self.height = 36
         self.n_frames = 6
         self.storage_move_speed = 1200
 
-        self.sprite_sheet = SPRITE_DICT["drop_globe"]
-
-        self.frames = []
-        for i in range(self.n_frames):
-            rect = pygame.Rect(i * self.width_per_frame, 0, self.width_per_frame, self.height)
-            
-            self.frames.append(self.sprite_sheet.subsurface(rect).copy())
+        self.frames = get_frames("drop_globe", self.width_per_frame, self.height, self.n_frames)
     
         self.image = self.frames[0]
         self.rect = self.image.get_rect(midbottom=pos)
@@ -40,7 +36,9 @@ class DropGlobe(pygame.sprite.Sprite):
         self._move_to_storage(dt, world)
 
 
-    def collect(self, x_storage, y_storage):
+    def collect(self, x_storage, y_storage, view_offset=(0, 0)):
+        # collected globes fly to the UI in screen space
+        self._update_pos(self.pos - view_offset)
         self.has_been_collected = True
         self.image = self.frames[int(self.frame_index)]
         self.storage_pos = pygame.Vector2((x_storage, y_storage))
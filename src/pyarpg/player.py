@@ -4,6 +4,8 @@ from pyarpg.assets import SPRITE_DICT
 from pyarpg.world import World
 
 class Player(pygame.sprite.Sprite):
+    hit_sound = None
+
     def __init__(self, pos, move_speed=400, dash_speed=1200, dash_distance=150, max_hp=100, pickup_radius=40):
         super().__init__()
 
@@ -11,6 +13,8 @@ class Player(pygame.sprite.Sprite):
         self.image = SPRITE_DICT["player_test"]
         self.rect = self.image.get_rect(center=pos)
         self.pickup_rect = self.rect.inflate(self.pickup_radius * 2, self.pickup_radius * 2)
+        # where the last update started, for swept collision tests
+        self.prev_rect = self.rect.copy()
 
         self.pos: Vector2 = pygame.Vector2(self.rect.center)
 
@@ -34,6 +38,10 @@ class Player(pygame.sprite.Sprite):
     def take_damage(self, n_dmg):
         self.current_hp = self.current_hp - n_dmg
 
+    def apply_damage(self, n_dmg, world):
+        self.take_damage(n_dmg)
+        return False
+
     def set_dash_target(self, aimed_pos):
         offset = aimed_pos - self.pos
         if offset.length_squared() == 0:
@@ -45,6 +53,7 @@ class Player(pygame.sprite.Sprite):
         self.is_dashing = True
 
     def update(self, dt: float, world: World):
+        self.prev_rect = self.rect.copy()
         if self.current_target_pos is not None:
             self.move_to_target(dt, world)
 
@@ -0,0 +1,85 @@
+"""Free lists for short-lived sprites.
+
+Sprites that are created and killed in large numbers (projectiles, ground
+skills, drop globes) derive from PooledSprite and put all of their state
+setup into reset. Decorating the class with pooled keeps a pre-warmed pool
+per class, cls.acquire(...) takes an instance from it and kill() puts the
+instance back.
+"""
+import pygame
+
+
+class Pool:
+    def __init__(self, cls, capacity=0):
+        self.cls = cls
+        self.capacity = capacity
+        self.free = []
+        self.n_created = 0
+        self.prewarm(capacity)
+
+    def _create(self):
+        # blank instance, reset fills in the state on acquire
+        sprite = self.cls.__new__(self.cls)
+        pygame.sprite.Sprite.__init__(sprite)
+        sprite._pool = self
+        sprite.in_pool = True
+        self.n_created += 1
+        return sprite
+
+    def prewarm(self, n):
+        while len(self.free) < n:
+            self.free.append(self._create())
+
+    def acquire(self, *args, **kwargs):
+        sprite = self.free.pop() if self.free else self._create()
+        sprite.in_pool = False
+        sprite.reset(*args, **kwargs)
+        return sprite
+
+    def release(self, sprite):
+        """Returns False if sprite was already back in the pool."""
+        if sprite.in_pool:
+            return False
+
+        sprite.in_pool = True
+        self.free.append(sprite)
+        return True
+
+
+class PooledSprite(pygame.sprite.Sprite):
+    """Sprite whose state is set up by its subclass' reset, so instances can be reused.
+
+    Instances created directly are not pooled, kill() only returns
+    instances that came from the pool.
+    """
+
+    pool = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._pool = None
+        self.in_pool = False
+        self.reset(*args, **kwargs)
+
+    @classmethod
+    def acquire(cls, *args, **kwargs):
+        # only the class' own pool, a subclass must not draw from its parent's
+        pool = cls.__dict__.get("pool")
+        if pool is None:
+            return cls(*args, **kwargs)
+        return pool.acquire(*args, **kwargs)
+
+    def kill(self):
+        super().kill()
+        if self._pool is not None:
+            self._pool.release(self)
+
+
+def pooled(capacity):
+    """Class decorator giving a PooledSprite subclass its own pool."""
+
+    def decorate(cls):
+        cls.pool = Pool(cls, capacity)
+        return cls
+
+    return decorate
@@ -1,21 +1,15 @@
 import pygame
 
-from pyarpg.assets import SPRITE_DICT
+from pyarpg.assets import get_frames
 
 
 class Portal(pygame.sprite.Sprite):
     def __init__(self, pos):
-        self.sprite_sheet = SPRITE_DICT["portal"]
-
         self.width_per_frame = 44
         self.height = 57
         self.n_frames = 8
 
-        self.frames = []
-        for i in range(self.n_frames):
-            rect = pygame.Rect(i * self.width_per_frame, 0, self.width_per_frame, self.height)
-            
-            self.frames.append(pygame.transform.scale(self.sprite_sheet.subsurface(rect).copy(), (66, 86)))
+        self.frames = get_frames("portal", self.width_per_frame, self.height, self.n_frames, scale=(66, 86))
 
         self.image = self.frames[0]
         self.rect = self.image.get_rect(midbottom=pos)
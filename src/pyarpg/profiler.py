@@ -0,0 +1,184 @@
+"""Per-system frame timings.
+
+Code under measurement wraps itself in profiler.scope(name). Time spent in
+a scope is summed over the frame, and end_frame writes one sample per
+scope into a ring buffer holding the last capacity frames. A disabled
+profiler hands out a shared no-op scope, so the instrumentation can stay in
+place at close to no cost.
+"""
+import json
+import time
+from array import array
+
+import pygame
+
+from pyarpg.assets import FONT_DICT
+
+
+class _NullScope:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class _Scope:
+    __slots__ = ("totals", "name", "start")
+
+    def __init__(self, totals, name):
+        self.totals = totals
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.totals[self.name] += time.perf_counter_ns() - self.start
+        return False
+
+
+class FrameProfiler:
+    """Named scopes timed with perf_counter_ns, kept per frame in ring buffers.
+
+    Scopes of the same name must not nest. Names show up in the order they
+    were first entered.
+    """
+
+    def __init__(self, capacity=600, enabled=False):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.n_frames = 0
+
+        self.names = []
+        self.samples = {}
+        self._totals = {}
+        self._scopes = {}
+
+    def scope(self, name):
+        if not self.enabled:
+            return _NULL_SCOPE
+
+        scope = self._scopes.get(name)
+        if scope is None:
+            scope = _Scope(self._totals, name)
+            self._scopes[name] = scope
+            self._totals[name] = 0
+            self.names.append(name)
+            # frames before the first use count as zero
+            self.samples[name] = array("q", bytes(8 * self.capacity))
+        return scope
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+
+        slot = self.n_frames % self.capacity
+        totals = self._totals
+        for name in self.names:
+            self.samples[name][slot] = totals[name]
+            totals[name] = 0
+        self.n_frames += 1
+
+    def clear(self):
+        self.n_frames = 0
+        self.names = []
+        self.samples = {}
+        self._totals = {}
+        self._scopes = {}
+
+    def history(self, name):
+        """Samples of name in ns, oldest frame first."""
+        samples = self.samples[name]
+        n = min(self.n_frames, self.capacity)
+        start = self.n_frames % self.capacity if self.n_frames > self.capacity else 0
+        return samples[start:n] + samples[:start]
+
+    def summary(self, name):
+        """(last, mean, p99) in ms over the buffered frames."""
+        samples = self.history(name)
+        if not samples:
+            return 0.0, 0.0, 0.0
+
+        ordered = sorted(samples)
+        p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+        return samples[-1] / 1e6, sum(samples) / len(samples) / 1e6, p99 / 1e6
+
+    def dump_csv(self, path):
+        """One row per buffered frame, one column of ns per scope."""
+        columns = [self.history(name) for name in self.names]
+        first_frame = self.n_frames - len(columns[0]) if columns else 0
+        with open(path, "w") as f:
+            f.write(",".join(["frame"] + self.names) + "\n")
+            for ix, row in enumerate(zip(*columns)):
+                f.write(",".join(str(value) for value in (first_frame + ix,) + row) + "\n")
+
+    def dump_json(self, path):
+        """Per-scope summary and the raw ns samples, oldest frame first."""
+        trace = {"n_frames": self.n_frames, "scopes": {}}
+        for name in self.names:
+            last_ms, mean_ms, p99_ms = self.summary(name)
+            trace["scopes"][name] = {
+                "mean_ms": mean_ms,
+                "p99_ms": p99_ms,
+                "samples_ns": self.history(name).tolist(),
+            }
+        with open(path, "w") as f:
+            json.dump(trace, f)
+
+
+class ProfilerOverlay:
+    """Text panel with the last and p99 ms of every scope.
+
+    The text is only re-rendered every refresh_interval seconds, sorting the
+    buffers for p99 each frame would show up in the numbers.
+    """
+
+    def __init__(self, profiler, pos=(8, 8), font_name="press_start_18", refresh_interval=0.25):
+        self.profiler = profiler
+        self.pos = pos
+        self.font_name = font_name
+        self.refresh_interval = refresh_interval
+        self.visible = False
+        self.surface = None
+        self._since_refresh = refresh_interval
+
+    def toggle(self):
+        self.visible = not self.visible
+        self._since_refresh = self.refresh_interval
+
+    def _render(self):
+        font = FONT_DICT[self.font_name]
+        lines = [f"{'scope':<16}{'ms':>7}{'p99':>7}"]
+        for name in self.profiler.names:
+            last_ms, _, p99_ms = self.profiler.summary(name)
+            lines.append(f"{name[:16]:<16}{last_ms:7.2f}{p99_ms:7.2f}")
+
+        labels = [font.render(line, False, (220, 220, 220)) for line in lines]
+        line_height = font.get_linesize()
+        width = max(label.get_width() for label in labels) + 8
+        surface = pygame.Surface((width, line_height * len(labels) + 8), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 160))
+        for ix, label in enumerate(labels):
+            surface.blit(label, (4, 4 + ix * line_height))
+        return surface
+
+    def update(self, dt):
+        if not self.visible:
+            return
+
+        self._since_refresh += dt
+        if self.surface is None or self._since_refresh >= self.refresh_interval:
+            self.surface = self._render()
+            self._since_refresh = 0.0
+
+    def draw(self, surface):
+        """Returns the covered rect, or None while hidden."""
+        if not self.visible or self.surface is None:
+            return None
+        return surface.blit(self.surface, self.pos)
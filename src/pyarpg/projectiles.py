@@ -0,0 +1,339 @@
+import itertools
+
+import numpy as np
+
+
+class ProjectileBatch:
+    """Straight-flying projectiles stored as arrays instead of sprites.
+
+    Mirrors Projectile: a projectile leaves the muzzle towards the aimed
+    position, flies max_distance at its move speed and disappears the tick
+    after it arrives. All of them move in one vectorized step and hits
+    against a target group are found in bulk with the same rect overlap
+    test groupcollide uses.
+    """
+
+    def __init__(self, capacity=256):
+        self.images = []
+        self.image_ids = {}
+
+        self.n = 0
+        self.pos = np.zeros((capacity, 2))
+        self.prev_pos = np.zeros((capacity, 2))
+        self.direction = np.zeros((capacity, 2))
+        self.speed = np.zeros(capacity)
+        self.remaining = np.zeros(capacity)
+        self.damage = np.zeros(capacity, dtype=np.int64)
+        self.half_size = np.zeros((capacity, 2), dtype=np.int64)
+        self.size = np.zeros((capacity, 2), dtype=np.int64)
+        self.image_ix = np.zeros(capacity, dtype=np.int64)
+        self.expired = np.zeros(capacity, dtype=bool)
+
+    _ARRAYS = ("pos", "prev_pos", "direction", "speed", "remaining", "damage", "half_size", "size", "image_ix", "expired")
+
+    def __len__(self):
+        return self.n
+
+    def _reserve(self, n):
+        capacity = len(self.speed)
+        if n <= capacity:
+            return
+
+        while capacity < n:
+            capacity *= 2
+
+        for name in self._ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def _image_id(self, image):
+        image_id = self.image_ids.get(image)
+        if image_id is None:
+            image_id = len(self.images)
+            self.images.append(image)
+            self.image_ids[image] = image_id
+        return image_id
+
+    def spawn_many(self, image, start_pos, aimed_target_pos, max_distance=500, move_speed=400, muzzle_offset=20, damage=10):
+        """Launch one projectile per row of the (k, 2) start and aimed positions."""
+        start_pos = np.asarray(start_pos, dtype=float).reshape(-1, 2)
+        aimed_target_pos = np.asarray(aimed_target_pos, dtype=float).reshape(-1, 2)
+        k = len(start_pos)
+        if k == 0:
+            return
+
+        offset = aimed_target_pos - start_pos
+        length = np.hypot(offset[:, 0], offset[:, 1])
+        direction = np.empty_like(offset)
+        # same fallback as Projectile when aiming at the muzzle itself
+        direction[:] = np.sqrt(0.5)
+        aimed = length > 0
+        direction[aimed] = offset[aimed] / length[aimed, None]
+
+        start = self.n
+        end = start + k
+        self._reserve(end)
+        pos = start_pos + muzzle_offset * direction
+        w, h = image.get_size()
+
+        self.pos[start:end] = pos
+        self.prev_pos[start:end] = pos
+        self.direction[start:end] = direction
+        self.speed[start:end] = move_speed
+        self.remaining[start:end] = max_distance
+        self.damage[start:end] = damage
+        self.half_size[start:end] = (w // 2, h // 2)
+        self.size[start:end] = (w, h)
+        self.image_ix[start:end] = self._image_id(image)
+        self.expired[start:end] = False
+        self.n = end
+
+    def spawn(self, image, start_pos, aimed_target_pos, **kwargs):
+        self.spawn_many(image, (start_pos[0], start_pos[1]), (aimed_target_pos[0], aimed_target_pos[1]), **kwargs)
+
+    def launch(self, projectile_cls, start_pos, aimed_target_pos, damage=None):
+        """Launch with the parameters a Projectile subclass would use."""
+        self.spawn(start_pos=start_pos, aimed_target_pos=aimed_target_pos, **projectile_cls.launch_params(damage))
+
+    def _keep(self, keep):
+        n_kept = int(np.count_nonzero(keep))
+        if n_kept == self.n:
+            return
+
+        for name in self._ARRAYS:
+            arr = getattr(self, name)
+            arr[:n_kept] = arr[:self.n][keep]
+        self.n = n_kept
+
+    def clear(self):
+        self.n = 0
+
+    # columns of records(), in this order
+    RECORD_FIELDS = (
+        "x", "y", "prev_x", "prev_y", "dir_x", "dir_y", "speed", "remaining", "damage",
+        "half_w", "half_h", "w", "h", "image", "expired",
+    )
+
+    def records(self, image_key):
+        """The projectiles as one array per RECORD_FIELDS column, images as image_key(surface).
+
+        Columns are views of the batch arrays where they can be, copy them
+        before the batch steps again.
+        """
+        n = self.n
+        # only images still in use, the batch remembers every image it has seen
+        keys = np.zeros(len(self.images), dtype=np.int64)
+        for image_id in np.unique(self.image_ix[:n]).tolist():
+            keys[image_id] = image_key(self.images[image_id])
+        return (
+            self.pos[:n, 0], self.pos[:n, 1], self.prev_pos[:n, 0], self.prev_pos[:n, 1],
+            self.direction[:n, 0], self.direction[:n, 1], self.speed[:n], self.remaining[:n], self.damage[:n],
+            self.half_size[:n, 0], self.half_size[:n, 1], self.size[:n, 0], self.size[:n, 1],
+            keys[self.image_ix[:n]], self.expired[:n],
+        )
+
+    def load_records(self, columns, image):
+        """Replace all projectiles with the rows of RECORD_FIELDS columns, image(key) gives the surface of an image key."""
+        (x, y, prev_x, prev_y, dir_x, dir_y, speed, remaining, damage,
+         half_w, half_h, w, h, image_keys, expired) = columns
+        n = len(x)
+        self.clear()
+        self._reserve(n)
+        self.pos[:n, 0] = x
+        self.pos[:n, 1] = y
+        self.prev_pos[:n, 0] = prev_x
+        self.prev_pos[:n, 1] = prev_y
+        self.direction[:n, 0] = dir_x
+        self.direction[:n, 1] = dir_y
+        self.speed[:n] = speed
+        self.remaining[:n] = remaining
+        self.damage[:n] = damage
+        self.half_size[:n, 0] = half_w
+        self.half_size[:n, 1] = half_h
+        self.size[:n, 0] = w
+        self.size[:n, 1] = h
+        image_keys = np.asarray(image_keys, dtype=np.int64)
+        for key in np.unique(image_keys).tolist():
+            self.image_ix[:n][image_keys == key] = self._image_id(image(key))
+        self.expired[:n] = np.asarray(expired) != 0
+        self.n = n
+
+    def step(self, dt):
+        # projectiles that arrived last tick vanish now, like Projectile.update
+        self._keep(~self.expired[:self.n])
+        n = self.n
+        if n == 0:
+            return
+
+        self.prev_pos[:n] = self.pos[:n]
+        remaining = self.remaining[:n]
+        travel = np.minimum(self.speed[:n] * dt, remaining)
+        self.pos[:n] += self.direction[:n] * travel[:, None]
+        remaining -= travel
+        self.expired[:n] = remaining <= 0
+
+    def rects(self, pos=None):
+        """(n, 4) left, top, width, height, rounded the way pygame places rect centers."""
+        n = self.n
+        if pos is None:
+            pos = self.pos
+        rects = np.empty((n, 4), dtype=np.int64)
+        rects[:, :2] = np.trunc(pos[:n]).astype(np.int64) - self.half_size[:n]
+        rects[:, 2:] = self.size[:n]
+        return rects
+
+    def resolve_hits(self, targets):
+        """Find every projectile/target pair that overlapped during the last step and remove projectiles that hit.
+
+        Both the projectile and the target (if it keeps a prev_rect) are
+        swept over their last move, see collision.swept_overlap. Returns
+        (target, damage, projectile index) triples ordered by projectile,
+        then by the order of targets, like iterating over groupcollide's
+        result. Indices are only unique within one call.
+        """
+        n = self.n
+        targets = list(targets)
+        if n == 0 or not targets:
+            return []
+
+        rects = np.fromiter(
+            itertools.chain.from_iterable(
+                itertools.chain(target.rect, _prev_rect(target)) for target in targets
+            ),
+            np.int64,
+            8 * len(targets),
+        ).reshape(-1, 2, 4)
+        target_rects = rects[:, 0]
+        target_motion = rects[:, 0, :2] - rects[:, 1, :2]
+        proj_rects = self.rects()
+        proj_motion = proj_rects[:, :2] - self.rects(self.prev_pos)[:, :2]
+
+        proj_ix, target_ix = _overlapping_pairs(
+            _swept_bounds(proj_rects, proj_motion), _swept_bounds(target_rects, target_motion)
+        )
+        hit = _swept_overlap(
+            proj_rects[proj_ix], proj_motion[proj_ix], target_rects[target_ix], target_motion[target_ix]
+        )
+        proj_ix = proj_ix[hit]
+        target_ix = target_ix[hit]
+        if len(proj_ix) == 0:
+            return []
+
+        order = np.lexsort((target_ix, proj_ix))
+        proj_ix = proj_ix[order]
+        target_ix = target_ix[order]
+        damage = self.damage[proj_ix].tolist()
+        hits = [(targets[ix], dmg, p_ix) for ix, dmg, p_ix in zip(target_ix.tolist(), damage, proj_ix.tolist())]
+
+        keep = np.ones(n, dtype=bool)
+        keep[proj_ix] = False
+        self._keep(keep)
+        return hits
+
+    def blit_sequence(self, view, offset=(0, 0), alpha=1.0):
+        """(image, dest) pairs for projectiles overlapping the view, blended between ticks by alpha."""
+        n = self.n
+        if n == 0:
+            return []
+
+        pos = self.pos[:n]
+        if alpha < 1.0:
+            pos = self.prev_pos[:n] + (pos - self.prev_pos[:n]) * alpha
+
+        topleft = np.trunc(pos).astype(np.int64) - self.half_size[:n]
+        size = self.size[:n]
+        visible = np.flatnonzero(
+            (topleft[:, 0] < view.right) & (topleft[:, 0] + size[:, 0] > view.left)
+            & (topleft[:, 1] < view.bottom) & (topleft[:, 1] + size[:, 1] > view.top)
+        )
+
+        images = self.images
+        dest = (topleft[visible] - np.asarray(offset, dtype=np.int64)).tolist()
+        return [(images[ix], xy) for ix, xy in zip(self.image_ix[visible].tolist(), dest)]
+
+
+def _prev_rect(sprite):
+    prev = getattr(sprite, "prev_rect", None)
+    return sprite.rect if prev is None else prev
+
+
+def _swept_bounds(rects, motion):
+    """Boxes covering rects moved back by motion and the rects themselves."""
+    start = rects[:, :2] - motion
+    bounds = np.empty_like(rects)
+    bounds[:, :2] = np.minimum(rects[:, :2], start)
+    bounds[:, 2:] = np.maximum(rects[:, :2], start) + rects[:, 2:] - bounds[:, :2]
+    return bounds
+
+
+def _swept_overlap(a, a_motion, b, b_motion):
+    """Vectorized collision.swept_overlap over rows of (left, top, width, height) boxes."""
+    d = 2 * (a_motion - b_motion)
+    c = 2 * (a[:, :2] - b[:, :2]) - d + a[:, 2:] - b[:, 2:]
+    h = a[:, 2:] + b[:, 2:]
+
+    enter = np.zeros(len(a))
+    exit = np.ones(len(a))
+    hit = np.ones(len(a), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for axis in (0, 1):
+            c_ax = c[:, axis]
+            d_ax = d[:, axis]
+            h_ax = h[:, axis]
+            still = d_ax == 0
+            hit &= ~still | ((-h_ax < c_ax) & (c_ax < h_ax))
+
+            t0 = (-h_ax - c_ax) / d_ax
+            t1 = (h_ax - c_ax) / d_ax
+            moving = ~still
+            enter[moving] = np.maximum(enter[moving], np.minimum(t0, t1)[moving])
+            exit[moving] = np.minimum(exit[moving], np.maximum(t0, t1)[moving])
+
+    return hit & (enter < exit)
+
+
+def _overlapping_pairs(a, b):
+    """Index pairs of overlapping (left, top, width, height) rows of a and b.
+
+    Both sets are bucketed into a dense grid with cells at least as large as
+    any rect, so overlapping rects always sit in neighboring cells.
+    """
+    cell = int(max(a[:, 2:].max(), b[:, 2:].max(), 1))
+    a_center = a[:, :2] + a[:, 2:] // 2
+    b_center = b[:, :2] + b[:, 2:] // 2
+
+    lo = b_center.min(axis=0)
+    n_cols, n_rows = ((b_center.max(axis=0) - lo) // cell + 3).tolist()
+
+    def cell_keys(center):
+        # one cell border, so every neighbor key of a clipped cell is valid. Rows of a
+        # far outside b's bounds clip to an edge cell and fail the exact test below
+        col = np.clip((center[:, 0] - lo[0]) // cell + 1, 1, n_cols - 2)
+        row = np.clip((center[:, 1] - lo[1]) // cell + 1, 1, n_rows - 2)
+        return row * n_cols + col
+
+    b_keys = cell_keys(b_center)
+    order = np.argsort(b_keys, kind="stable")
+    cell_starts = np.zeros(n_rows * n_cols + 1, dtype=np.int64)
+    np.cumsum(np.bincount(b_keys, minlength=n_rows * n_cols), out=cell_starts[1:])
+
+    a_keys = cell_keys(a_center)
+    neighbor_offsets = np.array([dy * n_cols + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+    neighbor_keys = (a_keys[None, :] + neighbor_offsets[:, None]).ravel()
+    start = cell_starts[neighbor_keys]
+    counts = cell_starts[neighbor_keys + 1] - start
+    total = counts.sum()
+
+    a_ix = np.repeat(np.tile(np.arange(len(a)), len(neighbor_offsets)), counts)
+    run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+    b_ix = order[np.repeat(start, counts) + np.arange(total) - run_starts]
+
+    ra = a[a_ix]
+    rb = b[b_ix]
+    overlap = (
+        (ra[:, 0] < rb[:, 0] + rb[:, 2]) & (rb[:, 0] < ra[:, 0] + ra[:, 2])
+        & (ra[:, 1] < rb[:, 1] + rb[:, 3]) & (rb[:, 1] < ra[:, 1] + ra[:, 3])
+    )
+    return a_ix[overlap], b_ix[overlap]
@@ -0,0 +1,404 @@
+import numpy as np
+import pygame
+
+from pyarpg.assets import SPRITE_DICT
+from pyarpg.assets import cached_frames
+from pyarpg.assets import convert_for_display
+from pyarpg.enemies import cached_hit_feedback_frames
+from pyarpg.spatial import SpatialGroup
+
+
+def collect_shared_surfaces():
+    """Every long-lived surface sprites draw from: loaded images, sliced frames, hit frames."""
+    surfaces = list(SPRITE_DICT.loaded().values())
+    surfaces.extend(cached_frames())
+    surfaces.extend(cached_hit_feedback_frames())
+    return surfaces
+
+
+class TextureAtlas:
+    """Shelf-packs surfaces into a few large pages.
+
+    Surface alpha is baked into the per-pixel alpha of the page, so blitting
+    an area of a page looks the same as blitting the original surface.
+    """
+
+    def __init__(self, page_size=(2048, 1024), padding=1):
+        self.page_size = page_size
+        self.padding = padding
+        self.pages = []
+        self.regions = {}
+        self._dirty_pages = set()
+
+        # shelf cursor on the last page
+        self._x = 0
+        self._y = 0
+        self._shelf_height = 0
+
+    def __contains__(self, surface):
+        return surface in self.regions
+
+    def _new_page(self):
+        self.pages.append(pygame.Surface(self.page_size, pygame.SRCALPHA))
+        self._x = 0
+        self._y = 0
+        self._shelf_height = 0
+
+    def _place(self, w, h):
+        page_w, page_h = self.page_size
+        if not self.pages:
+            self._new_page()
+
+        if self._x + w > page_w:
+            self._x = 0
+            self._y += self._shelf_height + self.padding
+            self._shelf_height = 0
+
+        if self._y + h > page_h:
+            self._new_page()
+
+        rect = pygame.Rect(self._x, self._y, w, h)
+        self._x += w + self.padding
+        self._shelf_height = max(self._shelf_height, h)
+        return len(self.pages) - 1, rect
+
+    def add(self, surface):
+        """Pack surface, returns False if it does not fit on a page."""
+        if surface in self.regions:
+            return True
+
+        w, h = surface.get_size()
+        if w > self.page_size[0] or h > self.page_size[1]:
+            return False
+
+        page_ix, rect = self._place(w, h)
+        page = self.pages[page_ix]
+
+        # raw pixel copy, a normal blit would blend into the empty page
+        rgb = pygame.surfarray.pixels3d(page)
+        alpha = pygame.surfarray.pixels_alpha(page)
+        rgb[rect.left:rect.right, rect.top:rect.bottom] = pygame.surfarray.array3d(surface)
+        src_alpha = pygame.surfarray.array_alpha(surface)
+        surface_alpha = surface.get_alpha()
+        if surface_alpha is not None and surface_alpha < 255:
+            src_alpha = (src_alpha.astype(np.uint16) * surface_alpha // 255).astype(np.uint8)
+        alpha[rect.left:rect.right, rect.top:rect.bottom] = src_alpha
+        del rgb, alpha
+
+        self.regions[surface] = (page_ix, rect)
+        self._dirty_pages.add(page_ix)
+        return True
+
+    def add_many(self, surfaces):
+        # big surfaces first packs shelves tighter
+        for surface in sorted(surfaces, key=lambda s: s.get_height(), reverse=True):
+            self.add(surface)
+        self.finalize()
+
+    def finalize(self):
+        for page_ix in self._dirty_pages:
+            self.pages[page_ix] = convert_for_display(self.pages[page_ix])
+        self._dirty_pages.clear()
+
+    def lookup(self, surface):
+        region = self.regions.get(surface)
+        if region is None:
+            return None
+
+        page_ix, rect = region
+        return self.pages[page_ix], rect
+
+
+class RenderQueue:
+    """Collects everything drawn in a frame and submits it in one blits call.
+
+    Images found in the atlas are drawn as areas of an atlas page, anything
+    else (text, one-off surfaces) is blitted directly in the same call so the
+    draw order is kept.
+    """
+
+    def __init__(self, atlas=None):
+        self.atlas = atlas if atlas is not None else TextureAtlas()
+        self.items = []
+        self._n_shared = 0
+
+    def add(self, image, dest):
+        self.items.append((image, dest))
+
+    def add_group(self, group, offset=(0, 0), shift=None):
+        """Queue sprites, offset is subtracted from their (world) rects.
+
+        shift, if given, maps a sprite to an extra (dx, dy), used to draw
+        interpolated positions.
+        """
+        ox, oy = offset
+        if shift is not None:
+            for sprite in group:
+                dx, dy = shift(sprite)
+                self.items.append((sprite.image, (sprite.rect.x + dx - ox, sprite.rect.y + dy - oy)))
+        elif ox == 0 and oy == 0:
+            self.items.extend((sprite.image, sprite.rect) for sprite in group)
+        else:
+            self.items.extend((sprite.image, (sprite.rect.x - ox, sprite.rect.y - oy)) for sprite in group)
+
+    def pending_rects(self):
+        return [pygame.Rect(dest[0], dest[1], *image.get_size()) for image, dest in self.items]
+
+    def _sync_atlas(self):
+        shared = collect_shared_surfaces()
+        if len(shared) != self._n_shared:
+            self._n_shared = len(shared)
+            self.atlas.add_many(surface for surface in shared if surface not in self.atlas)
+
+    def flush(self, surface):
+        regions = self.atlas.regions
+        pages = self.atlas.pages
+
+        synced = False
+        blit_seq = []
+        for image, dest in self.items:
+            region = regions.get(image)
+            if region is None and not synced:
+                # new shared surfaces (a freshly sliced sheet, ...) join the atlas on first draw
+                self._sync_atlas()
+                synced = True
+                region = regions.get(image)
+
+            if region is None:
+                blit_seq.append((image, dest))
+            else:
+                page_ix, area = region
+                blit_seq.append((pages[page_ix], dest, area))
+
+        surface.blits(blit_seq, doreturn=False)
+        self.items.clear()
+
+
+class SceneRenderer:
+    """Draws a frame of the world, the UI bar and the static decorations.
+
+    With a PositionHistory sprites and the camera are drawn blended between
+    the previous and the current tick by history.alpha.
+    """
+
+    def __init__(self, world, render_queue, hp_bars, ui_bar, portal, decorations, bg_color, history=None):
+        self.world = world
+        self.render_queue = render_queue
+        self.hp_bars = hp_bars
+        self.ui_bar = ui_bar
+        self.portal = portal
+        self.decorations = decorations
+        self.bg_color = bg_color
+        self.history = history
+
+    def invalidate(self):
+        pass
+
+    def _offset(self):
+        if self.history is None:
+            return self.world.camera.offset
+        return self.history.camera_offset(self.world.camera)
+
+    def _shifts(self):
+        if self.history is None:
+            return None, None
+        return self.history.world_shift(), self.history.screen_shift()
+
+    def _visible(self, group, margin=0):
+        camera = self.world.camera
+        if camera.covers_world:
+            return group
+
+        if self.history is not None:
+            margin += self.history.margin
+        view = camera.rect.inflate(2 * margin, 2 * margin)
+
+        # the big groups answer from their spatial grid, the rest are few enough to test
+        if isinstance(group, SpatialGroup):
+            return group.sprites_in_rect(view)
+
+        return [sprite for sprite in group if view.colliderect(sprite.rect)]
+
+    def _visible_decorations(self, offset):
+        ox, oy = offset
+        view = pygame.Rect(offset, self.world.camera.rect.size)
+        return [
+            (image, (pos[0] - ox, pos[1] - oy))
+            for image, pos in self.decorations
+            if view.colliderect(image.get_rect(topleft=pos))
+        ]
+
+    def _queue_world(self, offset, shift):
+        """Queue the world layer."""
+        world = self.world
+        queue = self.render_queue
+
+        queue.add_group(self._visible([self.portal]), offset)
+        queue.add_group(self._visible(world.active_player_ground_skills), offset, shift)
+        queue.add_group(self._visible(world.pickups_waiting), offset, shift)
+        queue.add_group(self._visible(world.enemies), offset, shift)
+        queue.add_group(world.players, offset, shift)
+        queue.add_group(self._visible(world.active_enemy_skills), offset, shift)
+        self._queue_projectiles(world.enemy_projectiles, offset)
+        queue.add_group(self._visible(world.active_player_skills), offset, shift)
+        self._queue_projectiles(world.player_projectiles, offset)
+
+    def _hp_bar_sequence(self, offset, shift):
+        # HP bars hang above their enemy, keep enemies just below the view
+        damaged = self._visible(self.hp_bars.damaged, margin=self.hp_bars.y_offset)
+        return self.hp_bars.blit_sequence(damaged, offset, shift)
+
+    def _queue_projectiles(self, batch, offset):
+        if batch is None:
+            return
+
+        alpha = 1.0 if self.history is None else self.history.alpha
+        view = pygame.Rect(offset, self.world.camera.rect.size)
+        self.render_queue.items.extend(batch.blit_sequence(view, offset, alpha))
+
+    def draw(self, screen):
+        """Redraw everything, returns None meaning the whole screen changed."""
+        profiler = self.world.profiler
+        screen.fill(self.bg_color)
+
+        offset = self._offset()
+        world_shift, screen_shift = self._shifts()
+        with profiler.scope("draw_queue"):
+            self._queue_world(offset, world_shift)
+        with profiler.scope("draw_world"):
+            self.render_queue.flush(screen)
+        with profiler.scope("draw_hp_bars"):
+            screen.blits(self._hp_bar_sequence(offset, world_shift), doreturn=False)
+        with profiler.scope("draw_ui"):
+            self.ui_bar.draw(screen)
+
+            # collected pickups fly to the UI bar in screen space
+            self.render_queue.add_group(self.world.pickups_collected, shift=screen_shift)
+            for image, pos in self._visible_decorations(offset):
+                self.render_queue.add(image, pos)
+            self.render_queue.flush(screen)
+
+        return None
+
+
+class DirtyRectRenderer(SceneRenderer):
+    """Only redraws the areas that changed since the previous frame.
+
+    Areas covered last frame or this frame are restored from a pre-composited
+    background and redrawn, the UI bar and decorations are redrawn clipped to
+    those areas. Falls back to a full redraw when the changed area is larger
+    than max_dirty_share of the screen or spread over too many rects.
+
+    Dirty rects are merged until none overlap, otherwise semi-transparent
+    parts of the UI bar or decorations would be blended twice.
+    """
+
+    def __init__(self, *args, max_dirty_share=0.35, max_dirty_rects=128, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_dirty_share = max_dirty_share
+        self.max_dirty_rects = max_dirty_rects
+        self.background = None
+        self._prev_rects = None
+        self._ui_loot_count = None
+        self._camera_offset = None
+
+    def invalidate(self):
+        self._prev_rects = None
+
+    def _full_redraw(self, screen, current_rects):
+        self._prev_rects = current_rects
+        return super().draw(screen)
+
+    def _redraw_ui(self, screen, dirty):
+        for ix in self.ui_bar.rect.collidelistall(dirty):
+            screen.set_clip(dirty[ix])
+            self.ui_bar.draw(screen)
+        screen.set_clip(None)
+
+    def _redraw_decorations(self, screen, dirty, offset):
+        blit_seq = []
+        for image, pos in self._visible_decorations(offset):
+            image_rect = image.get_rect(topleft=pos)
+            for ix in image_rect.collidelistall(dirty):
+                area = dirty[ix].clip(image_rect)
+                blit_seq.append((image, area.topleft, area.move(-image_rect.x, -image_rect.y)))
+        screen.blits(blit_seq, doreturn=False)
+
+    def draw(self, screen):
+        queue = self.render_queue
+        if self.background is None or self.background.get_size() != screen.get_size():
+            self.background = convert_for_display(pygame.Surface(screen.get_size()))
+            self.background.fill(self.bg_color)
+            self._prev_rects = None
+
+        profiler = self.world.profiler
+        offset = self._offset()
+        world_shift, screen_shift = self._shifts()
+        with profiler.scope("draw_queue"):
+            self._queue_world(offset, world_shift)
+        world_rects = queue.pending_rects()
+        bar_seq = self._hp_bar_sequence(offset, world_shift)
+        bar_rects = [pygame.Rect(pos, image.get_size()) for image, pos in bar_seq]
+        n_world_items = len(queue.items)
+        queue.add_group(self.world.pickups_collected, shift=screen_shift)
+        collected_items = queue.items[n_world_items:]
+        del queue.items[n_world_items:]
+        collected_rects = [pygame.Rect(dest[0], dest[1], *image.get_size()) for image, dest in collected_items]
+        current_rects = world_rects + bar_rects + collected_rects
+
+        ui_changed = self.ui_bar.loot_count != self._ui_loot_count
+        self._ui_loot_count = self.ui_bar.loot_count
+
+        # a moving camera shifts every pixel
+        camera_moved = offset != self._camera_offset
+        self._camera_offset = offset
+
+        if self._prev_rects is None or camera_moved:
+            queue.items.clear()
+            return self._full_redraw(screen, current_rects)
+
+        dirty = self._prev_rects + current_rects
+        if len(dirty) > 4 * self.max_dirty_rects:
+            # far too busy to pay off, skip merging
+            queue.items.clear()
+            return self._full_redraw(screen, current_rects)
+
+        if ui_changed:
+            dirty.append(self.ui_bar.rect.copy())
+
+        screen_rect = screen.get_rect()
+        dirty = _merge_overlapping(rect.clip(screen_rect) for rect in dirty)
+        dirty_area = sum(rect.width * rect.height for rect in dirty)
+        if len(dirty) > self.max_dirty_rects or dirty_area > self.max_dirty_share * screen_rect.width * screen_rect.height:
+            queue.items.clear()
+            return self._full_redraw(screen, current_rects)
+
+        with profiler.scope("draw_world"):
+            screen.blits([(self.background, rect, rect) for rect in dirty], doreturn=False)
+            queue.flush(screen)
+        with profiler.scope("draw_hp_bars"):
+            screen.blits(bar_seq, doreturn=False)
+        with profiler.scope("draw_ui"):
+            self._redraw_ui(screen, dirty)
+
+            queue.items.extend(collected_items)
+            queue.flush(screen)
+            self._redraw_decorations(screen, dirty, offset)
+
+        self._prev_rects = current_rects
+        return dirty
+
+
+def _merge_overlapping(rects):
+    merged = []
+    for rect in rects:
+        if not (rect.width and rect.height):
+            continue
+
+        ix = rect.collidelist(merged)
+        while ix != -1:
+            rect = rect.union(merged.pop(ix))
+            ix = rect.collidelist(merged)
+        merged.append(rect)
+
+    return merged
@@ -0,0 +1,121 @@
+"""Input recording and replay.
+
+A recording holds what the simulation needs to run the same fight again:
+the settings the world was built with (including the spawn seed), and for
+every tick its dt plus the input events applied right before it. All
+values are packed little-endian with struct:
+
+    header  <4sHQIHBd   magic, version, seed, enemies, world screens, flags, tick dt
+    tick    <dH         dt, number of events
+    event   <BIdd       kind, key, x, y   (world position the event aimed at)
+
+Event positions are stored as doubles, so a replay hands the exact same
+Vector2 values to the player and the skills as the recorded session did.
+"""
+import struct
+
+MAGIC = b"PARP"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHQIHBd")
+TICK = struct.Struct("<dH")
+EVENT = struct.Struct("<BIdd")
+
+# event kinds, MOVE is the right mouse button, KEY a key press aimed at (x, y)
+MOVE = 0
+KEY = 1
+
+FLAG_BATCH_PROJECTILES = 1
+FLAG_AI_LOD = 2
+
+
+class ReplayConfig:
+    """The world settings a recording was made with."""
+
+    def __init__(self, seed, n_enemies=0, world_screens=1, tick_dt=1 / 60, batch_projectiles=False, ai_lod=False):
+        self.seed = seed
+        self.n_enemies = n_enemies
+        self.world_screens = world_screens
+        self.tick_dt = tick_dt
+        self.batch_projectiles = batch_projectiles
+        self.ai_lod = ai_lod
+
+    def pack(self):
+        flags = (FLAG_BATCH_PROJECTILES if self.batch_projectiles else 0) | (FLAG_AI_LOD if self.ai_lod else 0)
+        return HEADER.pack(MAGIC, VERSION, self.seed, self.n_enemies, self.world_screens, flags, self.tick_dt)
+
+    @classmethod
+    def unpack(cls, data):
+        magic, version, seed, n_enemies, world_screens, flags, tick_dt = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not an input recording")
+        if version != VERSION:
+            raise ValueError(f"input recording version {version}, expected {VERSION}")
+
+        return cls(
+            seed,
+            n_enemies=n_enemies,
+            world_screens=world_screens,
+            tick_dt=tick_dt,
+            batch_projectiles=bool(flags & FLAG_BATCH_PROJECTILES),
+            ai_lod=bool(flags & FLAG_AI_LOD),
+        )
+
+
+class InputRecorder:
+    """Writes a recording while the game runs.
+
+    Events are buffered until the next tick(dt) and written together with
+    it. Several moves before the same tick only keep the last one, the
+    player only acts on the latest target.
+    """
+
+    def __init__(self, path, config):
+        self.config = config
+        self.file = open(path, "wb")
+        self.file.write(config.pack())
+        self.events = []
+        self.n_ticks = 0
+
+    def move(self, pos):
+        if self.events and self.events[-1][0] == MOVE:
+            self.events.pop()
+        self.events.append((MOVE, 0, pos[0], pos[1]))
+
+    def key(self, key, pos):
+        self.events.append((KEY, key, pos[0], pos[1]))
+
+    def tick(self, dt):
+        self.file.write(TICK.pack(dt, len(self.events)))
+        for event in self.events:
+            self.file.write(EVENT.pack(*event))
+        self.events.clear()
+        self.n_ticks += 1
+
+    def close(self):
+        # events after the last tick never reached the simulation
+        self.file.close()
+
+
+class InputReplay:
+    """Reads a recording back, one (dt, events) pair per tick."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.config = ReplayConfig.unpack(self.data)
+        self.offset = HEADER.size
+        self.n_ticks = 0
+
+    @property
+    def finished(self):
+        return self.offset >= len(self.data)
+
+    def next_tick(self):
+        """(dt, [(kind, key, x, y), ...]) of the next tick."""
+        dt, n_events = TICK.unpack_from(self.data, self.offset)
+        self.offset += TICK.size
+        events = list(EVENT.iter_unpack(self.data[self.offset:self.offset + n_events * EVENT.size]))
+        self.offset += n_events * EVENT.size
+        self.n_ticks += 1
+        return dt, events
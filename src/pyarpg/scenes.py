@@ -1,13 +1,40 @@
 import pygame
 
+from pyarpg.assets import SOUNDS_DICT
+from pyarpg.assets import FONT_DICT
+from pyarpg.asset_cache import prefetch_images
+
+
 class TopDownScene:
+    sprite_prefetch = ("player_test", "empty_skill_slot", "fireball", "ring_of_fire", "tree1", "portal")
+    sound_prefetch = ()
+    font_prefetch = ("press_start_18",)
+    # (sound, n channels) that get mixer channels of their own
+    reserved_sounds = ()
+
     def __init__(self, world, previous_scene):
         self.world = world
 
+    @classmethod
+    def prefetch_assets(cls):
+        prefetch_images(cls.sprite_prefetch)
+        SOUNDS_DICT.prefetch(cls.sound_prefetch)
+        FONT_DICT.prefetch(cls.font_prefetch)
+
+    @classmethod
+    def reserve_channels(cls, sounds):
+        """Reserve the scene's channels on a SoundManager."""
+        for name, n_channels in cls.reserved_sounds:
+            sounds.reserve(name, n_channels)
 
 
 class MonsterScene(TopDownScene):
+    sprite_prefetch = TopDownScene.sprite_prefetch + (
+        "dummy", "dummy_flash", "melee", "melee_flash", "drop_globe"
+    )
+    sound_prefetch = TopDownScene.sound_prefetch + ("enemy_hit_sound",)
+    # hit feedback must not be cut off by other sounds, one channel per voice it may use
+    reserved_sounds = TopDownScene.reserved_sounds + (("enemy_hit_sound", 4),)
+
     def __init__(self, world, previous_scene):
         super().__init__(world, previous_scene)
-
-
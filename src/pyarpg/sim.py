@@ -0,0 +1,146 @@
+"""Headless simulation runner.
+
+Runs the same update/collision pipeline as the game loop at a fixed dt,
+without a window, with a scripted player and seeded enemy spawns:
+
+    python -m pyarpg.sim --enemies 500 --ticks 3000 --seed 0
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import random
+import time
+
+import pygame
+
+pygame.init()
+
+from pyarpg.world import World
+from pyarpg.level import spawn_random_enemies
+from pyarpg.skills import FireballProjectile
+from pyarpg.skills import RingOfFire
+from pyarpg.player import Player
+from pyarpg.stats import PlayerStats
+from pyarpg.simulation import step
+
+WORLD_SIZE = (1600, 900)
+LOOT_STORAGE_POS = (800, 860)
+
+
+class ScriptedInput:
+    """Deterministic stand-in for mouse and keyboard input.
+
+    Walks to random points, shoots fireballs at the closest enemy in range,
+    drops a ring of fire under itself and dashes away on fixed tick periods.
+    A period of None turns that action off.
+    """
+
+    def __init__(self, rng, move_every=90, fireball_every=20, ring_every=60, dash_every=150):
+        self.rng = rng
+        self.move_every = move_every
+        self.fireball_every = fireball_every
+        self.ring_every = ring_every
+        self.dash_every = dash_every
+
+    def _random_pos(self, world):
+        return pygame.Vector2(
+            self.rng.randint(0, world.max_width), self.rng.randint(0, world.max_height)
+        )
+
+    def apply(self, tick, world):
+        player = world.get_player()
+
+        if _due(tick, self.move_every):
+            player.set_target_pos(self._random_pos(world))
+
+        if _due(tick, self.fireball_every):
+            targets = world.get_enemies_in_radius(player.pos, FireballProjectile.target_range)
+            if targets:
+                target = min(targets, key=lambda e: (e.pos - player.pos).length_squared())
+                world.launch_player_projectile(FireballProjectile, player.pos, target.pos)
+
+        if _due(tick, self.ring_every):
+            world.add_active_player_ground_skill(RingOfFire.acquire(pygame.Vector2(player.pos)))
+
+        if _due(tick, self.dash_every):
+            player.set_dash_target(self._random_pos(world))
+
+
+def _due(tick, every):
+    return every is not None and tick % every == 0
+
+
+def build_world(n_enemies, seed, batch_steering=False, batch_projectiles=False, ai_lod=False, world_size=None):
+    rng = random.Random(seed)
+    world = World(
+        pygame.Rect((0, 0), WORLD_SIZE),
+        PlayerStats(),
+        world_size=world_size,
+        batch_steering=batch_steering,
+        batch_projectiles=batch_projectiles,
+        ai_lod=ai_lod,
+    )
+    if world.ai is not None:
+        # a time budget would make runs depend on the machine
+        world.ai.budget_ms = None
+    world.add_player(Player(pos=(WORLD_SIZE[0] // 2, WORLD_SIZE[1] // 2)))
+    spawn_random_enemies(world, n_enemies=n_enemies, rng=rng)
+    return world, rng
+
+
+def run(n_enemies=500, n_ticks=3000, dt=1 / 60, seed=0, batch_steering=False, batch_projectiles=False, ai_lod=False):
+    world, rng = build_world(
+        n_enemies, seed, batch_steering=batch_steering, batch_projectiles=batch_projectiles, ai_lod=ai_lod
+    )
+    script = ScriptedInput(rng)
+
+    start = time.perf_counter()
+    for tick in range(n_ticks):
+        script.apply(tick, world)
+        step(world, dt, LOOT_STORAGE_POS)
+        world.sounds.flush()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "ticks": n_ticks,
+        "seconds": elapsed,
+        "ticks_per_second": n_ticks / elapsed if elapsed > 0 else float("inf"),
+        "enemies_left": len(world.enemies),
+        "loot_count": world.player_stats.loot_count,
+        "player_hp": world.get_player().current_hp,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the game simulation without rendering.")
+    parser.add_argument("--enemies", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=3000)
+    parser.add_argument("--dt", type=float, default=1 / 60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-steering", action="store_true")
+    parser.add_argument("--batch-projectiles", action="store_true")
+    parser.add_argument("--ai-lod", action="store_true")
+    args = parser.parse_args()
+
+    result = run(
+        n_enemies=args.enemies,
+        n_ticks=args.ticks,
+        dt=args.dt,
+        seed=args.seed,
+        batch_steering=args.batch_steering,
+        batch_projectiles=args.batch_projectiles,
+        ai_lod=args.ai_lod,
+    )
+
+    print(f"{result['ticks']} ticks in {result['seconds']:.2f}s ({result['ticks_per_second']:.1f} ticks/s)")
+    print(
+        f"enemies left: {result['enemies_left']}, loot: {result['loot_count']}, "
+        f"player hp: {result['player_hp']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
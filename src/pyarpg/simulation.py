@@ -0,0 +1,121 @@
+from pyarpg.collision import CENTER_IN_RADIUS
+from pyarpg.collision import SWEPT
+from pyarpg.collision import CollisionChannel
+from pyarpg.collision import CollisionStage
+from pyarpg.collision import radius_bounds
+from pyarpg.collision import swept_bounds
+from pyarpg.collision import swept_collider
+
+
+def update_world(world, dt):
+    world.time += dt
+    profiler = world.profiler
+    with profiler.scope("players"):
+        world.players.update(dt, world)
+    with profiler.scope("player_skills"):
+        world.active_player_skills.update(dt, world)
+        if world.player_projectiles is not None:
+            world.player_projectiles.step(dt)
+    with profiler.scope("ground_skills"):
+        world.active_player_ground_skills.update(dt, world)
+    with profiler.scope("aggro"):
+        world.update_aggro()
+    with profiler.scope("enemies"):
+        if world.ai is not None:
+            world.ai.update(dt, world)
+        else:
+            world.enemies.update(dt, world)
+    with profiler.scope("steering"):
+        world.steer_enemies(dt)
+    with profiler.scope("enemy_skills"):
+        world.active_enemy_skills.update(dt, world)
+        if world.enemy_projectiles is not None:
+            world.enemy_projectiles.step(dt)
+    with profiler.scope("pickups"):
+        world.pickups_waiting.update(dt, world)
+        world.pickups_collected.update(dt, world)
+
+
+def damage_channels(world):
+    return [
+        # projectiles and the dashing player are tested over their whole move
+        CollisionChannel(
+            "player_skills",
+            world.active_player_skills,
+            world.enemies,
+            narrow=SWEPT,
+            bounds_a=swept_bounds(),
+            dokilla=True,
+        ),
+        CollisionChannel(
+            "enemy_skills",
+            world.active_enemy_skills,
+            world.players,
+            narrow=SWEPT,
+            bounds_a=swept_bounds(),
+            bounds_b=swept_bounds(),
+            dokilla=True,
+        ),
+        # ground skills only hit during their first two frames
+        CollisionChannel(
+            "ground_skills",
+            world.active_player_ground_skills,
+            world.enemies,
+            narrow=CENTER_IN_RADIUS,
+            bounds_a=radius_bounds,
+            active_a=lambda skill: skill.frames_active < 2,
+        ),
+    ]
+
+
+def pickup_channels(world):
+    return [
+        CollisionChannel(
+            "pickups",
+            world.players,
+            world.pickups_waiting,
+            narrow=swept_collider(attr_a="pickup_rect"),
+            bounds_a=swept_bounds("pickup_rect"),
+        )
+    ]
+
+
+def resolve_collisions(world, loot_storage_pos):
+    hits = CollisionStage(damage_channels(world)).detect()
+    combat = world.combat
+
+    for projectile, hit_enemies in hits["player_skills"].items():
+        for enemy in hit_enemies:
+            combat.hit(enemy, projectile.damage, projectile)
+
+    for attack, hit_players in hits["enemy_skills"].items():
+        for player in hit_players:
+            combat.hit(player, attack.damage, attack)
+
+    for ground_skill, hit_enemies in hits["ground_skills"].items():
+        for enemy in hit_enemies:
+            combat.hit(enemy, ground_skill.damage, ground_skill)
+
+    for batch, targets in ((world.player_projectiles, world.enemies), (world.enemy_projectiles, world.players)):
+        if batch is not None:
+            for target, damage, projectile_ix in batch.resolve_hits(targets):
+                combat.hit(target, damage, (batch, projectile_ix))
+
+    world.combat_log = combat.resolve(world)
+    for name, count in world.combat_log.sound_requests().items():
+        world.sounds.request(name, count)
+
+    # after combat, so globes dropped by this tick's kills are picked up right away
+    pickup_hits = CollisionStage(pickup_channels(world)).detect()
+    for pickups in pickup_hits["pickups"].values():
+        for pickup in pickups:
+            pickup.collect(*loot_storage_pos, view_offset=world.camera.offset)
+            world.pickups_waiting.remove(pickup)
+            world.pickups_collected.add(pickup)
+
+
+def step(world, dt, loot_storage_pos):
+    """One tick of the game logic, shared by the game loop and headless runs."""
+    update_world(world, dt)
+    with world.profiler.scope("collisions"):
+        resolve_collisions(world, loot_storage_pos)
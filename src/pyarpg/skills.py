@@ -1,12 +1,13 @@
 import pygame
 from pyarpg.assets import SPRITE_DICT
+from pyarpg.assets import get_frames
+from pyarpg.pooling import PooledSprite
+from pyarpg.pooling import pooled
 
-class Projectile(pygame.sprite.Sprite):
+class Projectile(PooledSprite):
     target_range = None
 
-    def __init__(self, image, start_pos, aimed_target_pos, max_distance=500, move_speed=400, muzzle_offset=20, damage=10):
-        super().__init__()
-
+    def reset(self, image, start_pos, aimed_target_pos, max_distance=500, move_speed=400, muzzle_offset=20, damage=10):
         self.image = image
 
         start_target_offset = aimed_target_pos - start_pos
@@ -21,6 +22,8 @@ class Projectile(pygame.sprite.Sprite):
         self.target_pos = self.pos + self.direction * max_distance
 
         self.rect = self.image.get_rect(center=self.pos)
+        # where the last update started, for swept collision tests
+        self.prev_rect = self.rect.copy()
 
         self.move_speed = move_speed
         self.damage = damage
@@ -30,7 +33,9 @@ class Projectile(pygame.sprite.Sprite):
     def update(self, dt: float, world):
         if self.expired:
             self.kill()
+            return
 
+        self.prev_rect = self.rect.copy()
         self.move_to_target(dt)
     
     def _update_pos(self, new_pos):
@@ -50,37 +55,48 @@ class Projectile(pygame.sprite.Sprite):
         self._update_pos(self.pos + step)
 
 
+@pooled(capacity=256)
 class FireballProjectile(Projectile):
     target_range = 400
-    def __init__(self, start_pos, aimed_target_pos):
-        super().__init__(
+    damage = 15
+
+    @classmethod
+    def launch_params(cls, damage=None):
+        """Keyword arguments for reset besides the positions, shared with ProjectileBatch.launch.
+
+        damage defaults to the class' damage.
+        """
+        return dict(
             image=SPRITE_DICT["fireball"],
-            start_pos=start_pos,
-            aimed_target_pos=aimed_target_pos,
             move_speed=600,
-            damage=15,
+            damage=cls.damage if damage is None else damage,
             max_distance=500
         )
 
+    def reset(self, start_pos, aimed_target_pos, damage=None):
+        super().reset(start_pos=start_pos, aimed_target_pos=aimed_target_pos, **self.launch_params(damage))
+
 
+@pooled(capacity=256)
 class ShortFireballProjectile(Projectile):
     target_range = 70
+    damage = 15
 
-    def __init__(self, start_pos, aimed_target_pos):
-        super().__init__(
+    @classmethod
+    def launch_params(cls, damage=None):
+        return dict(
             image=SPRITE_DICT["fireball"],
-            start_pos=start_pos,
-            aimed_target_pos=aimed_target_pos,
             move_speed=600,
-            damage=15,
+            damage=cls.damage if damage is None else damage,
             max_distance=80,
             muzzle_offset=10
         )
 
-class GroundCircleAOESkill(pygame.sprite.Sprite):
-    def __init__(self, image, aimed_target_pos, max_distance=500, radius=30, damage=10, duration=0.2):
-        super().__init__()
+    def reset(self, start_pos, aimed_target_pos, damage=None):
+        super().reset(start_pos=start_pos, aimed_target_pos=aimed_target_pos, **self.launch_params(damage))
 
+class GroundCircleAOESkill(PooledSprite):
+    def reset(self, image, aimed_target_pos, max_distance=500, radius=30, damage=10, duration=0.2):
         self.image = image
         self.rect = self.image.get_rect(center=aimed_target_pos)
         self.pos = aimed_target_pos
@@ -105,40 +121,42 @@ class GroundCircleAOESkill(pygame.sprite.Sprite):
         if self.frames_active >= 2:
             return []
     
-        return [
-            e 
-            for e in entities
-            if (self.pos[0] - e.rect.center[0]) ** 2 + (self.pos[1] - e.rect.center[1]) ** 2 <= self.radius * self.radius
-        ]
+        return entities.query_radius(self.pos, self.radius)
 
 
-class BlueCircleAOESkill(GroundCircleAOESkill):
-    def __init__(self, aimed_target_pos, radius=120):
+_BLUE_CIRCLE_IMAGES = {}
+
+
+def _blue_circle_image(radius):
+    image = _BLUE_CIRCLE_IMAGES.get(radius)
+    if image is None:
         image = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
         pygame.draw.circle(image, (40, 92, 196, 100), (radius, radius), radius)
+        _BLUE_CIRCLE_IMAGES[radius] = image
+    return image
+
 
-        super().__init__(
-            image=image,
+@pooled(capacity=16)
+class BlueCircleAOESkill(GroundCircleAOESkill):
+    def reset(self, aimed_target_pos, radius=120):
+        super().reset(
+            image=_blue_circle_image(radius),
             aimed_target_pos=aimed_target_pos,
             radius=radius,
             damage=20
         )
 
 
-class RingOfFire(pygame.sprite.Sprite):
-    def __init__(self, aimed_target_pos, duration=0.3):
-        super().__init__()
-    
-        self.sprite_sheet = SPRITE_DICT["ring_of_fire"]
+@pooled(capacity=16)
+class RingOfFire(PooledSprite):
+    damage = 35
+
+    def reset(self, aimed_target_pos, duration=0.3):
         self.width_per_frame = 256
         self.height = 150
         self.n_frames = 12
 
-        self.frames = []
-        for i in range(self.n_frames):
-            rect = pygame.Rect(i * self.width_per_frame, 0, self.width_per_frame, self.height)
-            
-            self.frames.append(self.sprite_sheet.subsurface(rect).copy())
+        self.frames = get_frames("ring_of_fire", self.width_per_frame, self.height, self.n_frames)
     
         self.image = self.frames[0]
         self.rect = self.image.get_rect(center=aimed_target_pos)
@@ -148,7 +166,6 @@ class RingOfFire(pygame.sprite.Sprite):
         self.animation_speed = 30
 
         self.radius = 128
-        self.damage = 35
 
         self.expired = False
 
@@ -173,10 +190,6 @@ class RingOfFire(pygame.sprite.Sprite):
         if self.frames_active >= 2:
             return []
     
-        return [
-            e 
-            for e in entities
-            if (self.pos[0] - e.rect.center[0]) ** 2 + (self.pos[1] - e.rect.center[1]) ** 2 <= self.radius * self.radius
-        ]
+        return entities.query_radius(self.pos, self.radius)
 
 
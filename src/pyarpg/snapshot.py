@@ -0,0 +1,540 @@
+"""Binary World snapshots.
+
+A snapshot stores every section of the world (players, enemies, skills,
+pickups, projectile batches) column by column: each field is a packed
+little-endian array of its own type (doubles for positions and stats,
+small unsigned ints for flags, kinds and ranks), padded to 8 bytes. The
+fields and types of each section are fixed by the format version, so
+reading a field is a memoryview cast over the file, and load memory-maps
+the file instead of reading and decoding it first.
+
+Classes and images are stored as indices into a table of keys (class
+names and SPRITE_DICT names). Restoring builds the sprites from their
+classes again, so assets are never copied into the snapshot.
+
+    header   <4sHHQQ   magic, version, number of sections, keys offset, keys size
+    section  <16sIIQ   name, rows, fields per row, data offset   (one per section)
+    data     per section its columns in field order, then the keys joined by NUL
+
+Derived state is rebuilt instead of stored, with the orders that float
+sums and update order depend on: grid cells, steering slots and the AI
+scheduler's buckets. Hit feedback frames and pools are rebuilt as well.
+Skills come back with the parameters their reset defaults to.
+"""
+import itertools
+import math
+import mmap
+import struct
+from array import array
+from operator import attrgetter
+
+import numpy as np
+import pygame
+
+from pyarpg.assets import SPRITE_DICT
+from pyarpg.enemies import MeleeEnemy
+from pyarpg.enemies import RangedEnemy
+from pyarpg.pickups import DropGlobe
+from pyarpg.projectiles import ProjectileBatch
+from pyarpg.player import Player
+from pyarpg.skills import BlueCircleAOESkill
+from pyarpg.skills import FireballProjectile
+from pyarpg.skills import RingOfFire
+from pyarpg.skills import ShortFireballProjectile
+from pyarpg.stats import PlayerStats
+from pyarpg.world import World
+
+MAGIC = b"PWSN"
+VERSION = 4
+
+HEADER = struct.Struct("<4sHHQQ")
+SECTION = struct.Struct("<16sIIQ")
+
+KINDS = {
+    cls.__name__: cls
+    for cls in (RangedEnemy, MeleeEnemy, FireballProjectile, ShortFireballProjectile, RingOfFire, BlueCircleAOESkill)
+}
+
+# (field, array typecode) per section: d double, i int32, B/H/I/Q unsigned 8/16/32/64 bit
+WORLD_FIELDS = (
+    ("time", "d"), ("loot_count", "I"), ("width", "I"), ("height", "I"), ("cell_size", "I"), ("flags", "B"),
+    ("camera_x", "i"), ("camera_y", "i"),
+)
+PLAYER_FIELDS = (
+    ("x", "d"), ("y", "d"), ("rect_x", "i"), ("rect_y", "i"), ("prev_x", "i"), ("prev_y", "i"),
+    ("hp", "d"), ("max_hp", "d"), ("target_x", "d"), ("target_y", "d"), ("has_target", "B"), ("is_dashing", "B"),
+    ("move_speed", "d"), ("dash_speed", "d"), ("dash_distance", "d"), ("pickup_radius", "I"),
+)
+ENEMY_FIELDS = (
+    ("kind", "H"), ("x", "d"), ("y", "d"), ("rect_x", "i"), ("rect_y", "i"), ("hp", "d"), ("max_hp", "d"),
+    ("aggro_range", "d"), ("aggro_time", "d"), ("atk_speed", "d"), ("attack_damage", "d"),
+    ("move_speed", "d"), ("backoff_move_speed", "d"), ("min_distance", "d"), ("max_distance", "d"),
+    ("since_attack", "d"), ("is_aggro", "B"), ("in_range", "B"), ("aggro_expires", "d"), ("hit_fx_time", "d"),
+    ("feedback", "B"), ("cell_rank", "I"), ("steering_slot", "I"),
+    ("ai_tier", "B"), ("ai_phase", "I"), ("ai_rank", "I"), ("ai_last_update", "d"), ("ai_deferred", "i"),
+)
+# AIScheduler clock and settings, plus one row per tier
+AI_FIELDS = (("time", "d"), ("tick", "Q"), ("budget_ms", "d"), ("near_radius", "d"))
+AI_TIER_FIELDS = (("interval", "I"), ("next_phase", "I"))
+PROJECTILE_FIELDS = (
+    ("kind", "H"), ("x", "d"), ("y", "d"), ("rect_x", "i"), ("rect_y", "i"), ("prev_x", "i"), ("prev_y", "i"),
+    ("dir_x", "d"), ("dir_y", "d"), ("target_x", "d"), ("target_y", "d"),
+    ("move_speed", "d"), ("damage", "d"), ("expired", "B"),
+)
+GROUND_SKILL_FIELDS = (
+    ("kind", "H"), ("x", "d"), ("y", "d"), ("remaining", "d"), ("frames_active", "I"), ("frame_index", "d"),
+)
+PICKUP_FIELDS = (
+    ("x", "d"), ("y", "d"), ("rect_x", "i"), ("rect_y", "i"), ("frame_index", "d"), ("collected", "B"),
+    ("storage_x", "d"), ("storage_y", "d"), ("cell_rank", "I"),
+)
+# ProjectileBatch.records columns
+BATCH_FIELDS = (
+    ("x", "d"), ("y", "d"), ("prev_x", "d"), ("prev_y", "d"), ("dir_x", "d"), ("dir_y", "d"),
+    ("speed", "d"), ("remaining", "d"), ("damage", "i"), ("half_w", "i"), ("half_h", "i"), ("w", "i"), ("h", "i"),
+    ("image", "H"), ("expired", "B"),
+)
+
+FLAG_BATCH_STEERING = 1
+FLAG_BATCH_PROJECTILES = 2
+FLAG_AI_LOD = 4
+
+
+class _Keys:
+    """Key table built while saving, a key's index is what the records store."""
+
+    def __init__(self):
+        self.keys = []
+        self.index = {}
+        self._image_keys = None
+
+    def __call__(self, key):
+        ix = self.index.get(key)
+        if ix is None:
+            ix = len(self.keys)
+            self.keys.append(key)
+            self.index[key] = ix
+        return ix
+
+    def image(self, surface):
+        if self._image_keys is None:
+            self._image_keys = {id(image): name for name, image in SPRITE_DICT.loaded().items()}
+        name = self._image_keys.get(id(surface))
+        if name is None:
+            raise ValueError("projectile image is not a SPRITE_DICT asset")
+        return self(name)
+
+
+def _player_record(player):
+    target = player.current_target_pos
+    return (
+        player.pos.x, player.pos.y, player.rect.x, player.rect.y, player.prev_rect.x, player.prev_rect.y,
+        player.current_hp, player.max_hp,
+        target[0] if target is not None else 0.0, target[1] if target is not None else 0.0,
+        target is not None, player.is_dashing,
+        player.move_speed, player.dash_speed, player.dash_distance, player.pickup_radius,
+    )
+
+
+def _projectile_record(projectile, keys):
+    return (
+        keys(type(projectile).__name__), projectile.pos.x, projectile.pos.y, projectile.rect.x, projectile.rect.y,
+        projectile.prev_rect.x, projectile.prev_rect.y, projectile.direction.x, projectile.direction.y,
+        projectile.target_pos.x, projectile.target_pos.y, projectile.move_speed, projectile.damage, projectile.expired,
+    )
+
+
+def _transposed(records, fields):
+    """Row tuples turned into one column per field."""
+    return list(zip(*records)) or [()] * len(fields)
+
+
+def _enemy_columns(world, keys):
+    """ENEMY_FIELDS columns, gathered one field at a time over all enemies."""
+    enemies = list(world.enemies)
+    in_range = world.aggro.in_range
+    expires_at = world.aggro.expires_at
+    # grid queries return sprites in cell arrival order, which float sums downstream depend on
+    enemy_ranks = world.enemies.grid.cell_ranks()
+
+    def each(getter):
+        return list(map(getter, enemies))
+
+    kinds = {cls: keys(cls.__name__) for cls in dict.fromkeys(map(type, enemies))}
+
+    steering = world.steering
+    if steering is not None:
+        # the batch arrays hold the positions, speeds and distance bands of the sprites
+        slots = np.fromiter(map(steering.slots.__getitem__, enemies), dtype=np.int64, count=len(enemies))
+        pos = steering.pos[slots]
+        x, y = pos[:, 0], pos[:, 1]
+        movement = (
+            steering.move_speed[slots], steering.backoff_move_speed[slots],
+            steering.min_distance[slots], steering.max_distance[slots],
+        )
+    else:
+        slots = [0] * len(enemies)
+        x, y = each(attrgetter("pos.x")), each(attrgetter("pos.y"))
+        movement = (
+            each(attrgetter("move_speed")), each(attrgetter("backoff_move_speed")),
+            each(attrgetter("min_distance_to_player")), each(attrgetter("max_distance_to_player")),
+        )
+
+    ai = world.ai
+    if ai is not None:
+        ai_slots = each(ai.slots.__getitem__)
+        ai_ranks = ai.bucket_ranks()
+        ai_deferred = {enemy: rank for rank, enemy in enumerate(ai.deferred)}
+        ai_columns = (
+            [tier for tier, _ in ai_slots], [phase for _, phase in ai_slots], each(ai_ranks.__getitem__),
+            each(ai.last_update.__getitem__), [ai_deferred.get(enemy, -1) for enemy in enemies],
+        )
+    else:
+        zeros = [0] * len(enemies)
+        ai_columns = (zeros, zeros, zeros, zeros, [-1] * len(enemies))
+
+    return (
+        [kinds[type(enemy)] for enemy in enemies], x, y, each(attrgetter("rect.x")), each(attrgetter("rect.y")),
+        each(attrgetter("current_hp")), each(attrgetter("max_hp")), each(attrgetter("aggro_range")),
+        each(attrgetter("aggro_time")), each(attrgetter("atk_speed")), each(attrgetter("attack_damage")),
+        *movement,
+        each(attrgetter("time_since_last_attack")), each(attrgetter("is_aggro")),
+        [enemy in in_range for enemy in enemies], [expires_at.get(enemy, math.nan) for enemy in enemies],
+        each(attrgetter("hit_fx_time")), each(attrgetter("play_damage_feedback")), each(enemy_ranks.__getitem__),
+        slots, *ai_columns,
+    )
+
+
+def snapshot(world):
+    """The world packed into bytes."""
+    keys = _Keys()
+    ai = world.ai
+    pickup_ranks = world.pickups_waiting.grid.cell_ranks()
+    flags = (
+        (FLAG_BATCH_STEERING if world.steering is not None else 0)
+        | (FLAG_BATCH_PROJECTILES if world.player_projectiles is not None else 0)
+        | (FLAG_AI_LOD if world.ai is not None else 0)
+    )
+
+    sections = {
+        "world": [
+            (world.time,), (world.player_stats.loot_count,), (world.max_width,), (world.max_height,),
+            (world.enemies.grid.cell_size,), (flags,), (world.camera.rect.x,), (world.camera.rect.y,),
+        ],
+        "players": _transposed(map(_player_record, world.players), PLAYER_FIELDS),
+        "enemies": _enemy_columns(world, keys),
+        "player_skills": _transposed(
+            (_projectile_record(skill, keys) for skill in world.active_player_skills), PROJECTILE_FIELDS
+        ),
+        "enemy_skills": _transposed(
+            (_projectile_record(skill, keys) for skill in world.active_enemy_skills), PROJECTILE_FIELDS
+        ),
+        "ground_skills": _transposed(
+            (
+                (
+                    keys(type(skill).__name__), skill.pos[0], skill.pos[1], skill.remaining_duration,
+                    skill.frames_active, getattr(skill, "frame_index", 0),
+                )
+                for skill in world.active_player_ground_skills
+            ),
+            GROUND_SKILL_FIELDS,
+        ),
+        "pickups": _transposed(
+            (
+                (
+                    pickup.pos.x, pickup.pos.y, pickup.rect.x, pickup.rect.y, pickup.frame_index,
+                    pickup.has_been_collected,
+                    pickup.storage_pos[0] if pickup.has_been_collected else 0.0,
+                    pickup.storage_pos[1] if pickup.has_been_collected else 0.0,
+                    pickup_ranks.get(pickup, 0),
+                )
+                for pickup in itertools.chain(world.pickups_waiting, world.pickups_collected)
+            ),
+            PICKUP_FIELDS,
+        ),
+    }
+    if ai is not None:
+        budget_ms = math.nan if ai.budget_ms is None else ai.budget_ms
+        sections["ai"] = [(ai.time,), (ai.tick,), (budget_ms,), (ai.near_radius,)]
+        sections["ai_tiers"] = [ai.intervals, ai.next_phases()]
+    if world.player_projectiles is not None:
+        sections["player_batch"] = world.player_projectiles.records(keys.image)
+        sections["enemy_batch"] = world.enemy_projectiles.records(keys.image)
+
+    return _pack(sections, keys.keys)
+
+
+_FIELDS = {
+    "world": WORLD_FIELDS,
+    "players": PLAYER_FIELDS,
+    "enemies": ENEMY_FIELDS,
+    "player_skills": PROJECTILE_FIELDS,
+    "enemy_skills": PROJECTILE_FIELDS,
+    "ground_skills": GROUND_SKILL_FIELDS,
+    "pickups": PICKUP_FIELDS,
+    "ai": AI_FIELDS,
+    "ai_tiers": AI_TIER_FIELDS,
+    "player_batch": BATCH_FIELDS,
+    "enemy_batch": BATCH_FIELDS,
+}
+
+
+# numpy dtypes of the array typecodes, for columns that come as numpy arrays
+_DTYPES = {"d": "<f8", "i": "<i4", "B": "<u1", "H": "<u2", "I": "<u4", "Q": "<u8"}
+
+
+def _column_bytes(values, typecode):
+    if isinstance(values, np.ndarray):
+        return np.ascontiguousarray(values, dtype=_DTYPES[typecode]).tobytes()
+    return array(typecode, values).tobytes()
+
+
+def _padding(size):
+    return -size % 8
+
+
+def _pack(sections, keys):
+    blocks = []
+    directory = []
+    offset = HEADER.size + SECTION.size * len(sections)
+    for name, columns in sections.items():
+        fields = _FIELDS[name]
+        directory.append(SECTION.pack(name.encode(), len(columns[0]), len(fields), offset))
+        for values, (_, typecode) in zip(columns, fields, strict=True):
+            data = _column_bytes(values, typecode)
+            blocks.append(data + bytes(_padding(len(data))))
+            offset += len(blocks[-1])
+
+    keys_data = "\0".join(keys).encode()
+    header = HEADER.pack(MAGIC, VERSION, len(sections), offset, len(keys_data))
+    return b"".join([header] + directory + blocks + [keys_data])
+
+
+def save(world, path):
+    with open(path, "wb") as f:
+        f.write(snapshot(world))
+
+
+class Snapshot:
+    """Read-only view of packed snapshot data, sections are casts of the underlying buffer."""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        view = memoryview(buffer)
+        magic, version, n_sections, keys_offset, keys_size = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("not a world snapshot")
+        if version != VERSION:
+            raise ValueError(f"world snapshot version {version}, expected {VERSION}")
+
+        keys = bytes(view[keys_offset:keys_offset + keys_size]).decode()
+        self.keys = keys.split("\0") if keys else []
+
+        self.sections = {}
+        for ix in range(n_sections):
+            name, n_rows, n_fields, offset = SECTION.unpack_from(view, HEADER.size + ix * SECTION.size)
+            name = name.rstrip(b"\0").decode()
+            fields = _FIELDS[name]
+            if n_fields != len(fields):
+                raise ValueError(f"section {name} has {n_fields} fields, expected {len(fields)}")
+            columns = {}
+            for field, typecode in fields:
+                size = n_rows * struct.calcsize(typecode)
+                columns[field] = view[offset:offset + size].cast(typecode)
+                offset += size + _padding(size)
+            self.sections[name] = columns
+
+    def __contains__(self, name):
+        return name in self.sections
+
+    def columns(self, name):
+        """{field: column} of a section, each column a typed view of the buffer.
+
+        Iterating a column yields its values as Python numbers without
+        copying the section, a missing section has empty columns.
+        """
+        if name not in self.sections:
+            return {field: () for field, _ in _FIELDS[name]}
+        return self.sections[name]
+
+    def rows(self, name):
+        """Records of a section as tuples, read from its columns."""
+        return zip(*self.columns(name).values())
+
+    def row(self, name):
+        """The record of a one-row section."""
+        return next(self.rows(name))
+
+    def arrays(self, name):
+        """The columns of a section as numpy arrays sharing the buffer."""
+        return [np.asarray(column) for column in self.columns(name).values()]
+
+    def release(self):
+        self.sections = {}
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+
+def load(path):
+    """Snapshot memory-mapped from path, call release when done with it."""
+    with open(path, "rb") as f:
+        return Snapshot(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def _number(value):
+    """Whole numbers come back as int, the game keeps HP, speeds and damage as int."""
+    return int(value) if value.is_integer() else value
+
+
+def _restore_player(row):
+    (x, y, rect_x, rect_y, prev_x, prev_y, hp, max_hp, target_x, target_y, has_target, is_dashing,
+     move_speed, dash_speed, dash_distance, pickup_radius) = row
+    player = Player(
+        pos=(x, y), move_speed=_number(move_speed), dash_speed=_number(dash_speed),
+        dash_distance=_number(dash_distance), max_hp=_number(max_hp), pickup_radius=pickup_radius,
+    )
+    player.pos = pygame.Vector2(x, y)
+    player.rect.topleft = (rect_x, rect_y)
+    player.prev_rect = player.rect.copy()
+    player.prev_rect.topleft = (prev_x, prev_y)
+    player.pickup_rect = player.rect.inflate(player.pickup_radius * 2, player.pickup_radius * 2)
+    player.current_hp = _number(hp)
+    player.current_target_pos = pygame.Vector2(target_x, target_y) if has_target else None
+    player.is_dashing = bool(is_dashing)
+    return player
+
+
+def _restore_enemies(world, snap):
+    keys = snap.keys
+    columns = snap.columns("enemies")
+    enemies = []
+    for row in zip(*columns.values()):
+        (kind, x, y, rect_x, rect_y, hp, max_hp, aggro_range, aggro_time, atk_speed, attack_damage,
+         move_speed, backoff_move_speed, min_distance, max_distance, since_attack,
+         is_aggro, in_range, aggro_expires, hit_fx_time, feedback, *_) = row
+        enemy = KINDS[keys[kind]](start_pos=(x, y))
+        enemy.pos = pygame.Vector2(x, y)
+        enemy.rect.topleft = (rect_x, rect_y)
+        enemy.current_hp = _number(hp)
+        enemy.max_hp = _number(max_hp)
+        enemy.aggro_range = _number(aggro_range)
+        enemy.aggro_time = _number(aggro_time)
+        enemy.atk_speed = atk_speed
+        enemy.attack_damage = _number(attack_damage)
+        enemy.move_speed = _number(move_speed)
+        enemy.backoff_move_speed = _number(backoff_move_speed)
+        enemy.min_distance_to_player = _number(min_distance)
+        enemy.max_distance_to_player = _number(max_distance)
+        enemy.time_since_last_attack = since_attack
+        enemy.hit_fx_time = hit_fx_time
+        enemy.play_damage_feedback = bool(feedback)
+        world.add_enemy(enemy)
+        world.aggro.restore(
+            enemy, world, is_aggro, in_range, None if math.isnan(aggro_expires) else aggro_expires
+        )
+        enemies.append(enemy)
+
+    world.enemies.grid.reorder_cells(dict(zip(enemies, columns["cell_rank"])).__getitem__)
+    if world.steering is not None:
+        world.steering.reorder(dict(zip(enemies, columns["steering_slot"])).__getitem__)
+    if world.ai is not None and "ai" in snap:
+        _restore_ai(world.ai, snap, enemies, columns)
+
+
+def _restore_ai(ai, snap, enemies, columns):
+    time, tick, budget_ms, near_radius = snap.row("ai")
+    tiers = snap.columns("ai_tiers")
+    ai.budget_ms = None if math.isnan(budget_ms) else budget_ms
+    ai.near_radius = _number(near_radius)
+
+    placed = sorted(
+        zip(columns["ai_rank"], enemies, columns["ai_tier"], columns["ai_phase"], columns["ai_last_update"]),
+        key=lambda entry: entry[0],
+    )
+    deferred = sorted((rank, enemy) for rank, enemy in zip(columns["ai_deferred"], enemies) if rank >= 0)
+    ai.restore(
+        time,
+        tick,
+        list(tiers["interval"]),
+        list(tiers["next_phase"]),
+        [(enemy, tier, phase, last_update) for _, enemy, tier, phase, last_update in placed],
+        [enemy for _, enemy in deferred],
+    )
+
+
+def _restore_projectiles(snap, name, keys, add):
+    for row in snap.rows(name):
+        (kind, x, y, rect_x, rect_y, prev_x, prev_y, dir_x, dir_y, target_x, target_y,
+         move_speed, damage, expired) = row
+        projectile = KINDS[keys[kind]].acquire(pygame.Vector2(x, y), pygame.Vector2(target_x, target_y))
+        projectile.pos = pygame.Vector2(x, y)
+        projectile.rect.topleft = (rect_x, rect_y)
+        projectile.prev_rect = projectile.rect.copy()
+        projectile.prev_rect.topleft = (prev_x, prev_y)
+        projectile.direction = pygame.Vector2(dir_x, dir_y)
+        projectile.target_pos = pygame.Vector2(target_x, target_y)
+        projectile.move_speed = _number(move_speed)
+        projectile.damage = _number(damage)
+        projectile.expired = bool(expired)
+        add(projectile)
+
+
+def restore(snap, screen, player_stats=None):
+    """A new World built from a Snapshot (or packed bytes) for the given screen."""
+    if not isinstance(snap, Snapshot):
+        snap = Snapshot(snap)
+    keys = snap.keys
+
+    time, loot_count, width, height, cell_size, flags, camera_x, camera_y = snap.row("world")
+    if player_stats is None:
+        player_stats = PlayerStats()
+    player_stats.loot_count = loot_count
+
+    world = World(
+        screen,
+        player_stats,
+        cell_size=cell_size,
+        batch_steering=bool(flags & FLAG_BATCH_STEERING),
+        world_size=(width, height),
+        batch_projectiles=bool(flags & FLAG_BATCH_PROJECTILES),
+        ai_lod=bool(flags & FLAG_AI_LOD),
+    )
+    world.time = time
+
+    for row in snap.rows("players"):
+        world.add_player(_restore_player(row))
+    _restore_enemies(world, snap)
+    _restore_projectiles(snap, "player_skills", keys, world.add_active_player_skill)
+    _restore_projectiles(snap, "enemy_skills", keys, world.add_active_enemy_skill)
+
+    for kind, x, y, remaining, frames_active, frame_index in snap.rows("ground_skills"):
+        skill = KINDS[keys[kind]].acquire(pygame.Vector2(x, y))
+        skill.remaining_duration = remaining
+        skill.frames_active = frames_active
+        if hasattr(skill, "frame_index"):
+            skill.frame_index = frame_index
+            skill.image = skill.frames[int(frame_index)]
+        world.add_active_player_ground_skill(skill)
+
+    ranks = {}
+    for x, y, rect_x, rect_y, frame_index, collected, storage_x, storage_y, cell_rank in snap.rows("pickups"):
+        pickup = DropGlobe.acquire((x, y))
+        pickup.pos = pygame.Vector2(x, y)
+        pickup.rect.topleft = (rect_x, rect_y)
+        pickup.frame_index = frame_index
+        pickup.image = pickup.frames[int(frame_index)]
+        if collected:
+            pickup.has_been_collected = True
+            pickup.storage_pos = pygame.Vector2(storage_x, storage_y)
+            world.pickups_collected.add(pickup)
+        else:
+            world.add_pickup(pickup)
+            ranks[pickup] = cell_rank
+    world.pickups_waiting.grid.reorder_cells(ranks.__getitem__)
+
+    if world.player_projectiles is not None and "player_batch" in snap:
+        world.player_projectiles.load_records(snap.arrays("player_batch"), lambda key: SPRITE_DICT[keys[key]])
+        world.enemy_projectiles.load_records(snap.arrays("enemy_batch"), lambda key: SPRITE_DICT[keys[key]])
+
+    world.camera.rect.topleft = (camera_x, camera_y)
+    return world
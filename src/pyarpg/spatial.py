@@ -0,0 +1,148 @@
+import itertools
+
+import pygame
+
+
+class SpatialHash:
+    """Uniform grid bucketing sprites by the cell of their rect center."""
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        # cells map to insertion-ordered dicts so iteration stays deterministic
+        self.cells = {}
+        self.sprite_cells = {}
+        # largest sprite side seen, bounds how far a rect can reach past its cell
+        self.max_extent = 0
+
+    def __len__(self):
+        return len(self.sprite_cells)
+
+    def cell_of(self, pos):
+        return (int(pos[0] // self.cell_size), int(pos[1] // self.cell_size))
+
+    def insert(self, sprite):
+        self.max_extent = max(self.max_extent, sprite.rect.width, sprite.rect.height)
+        cell = self.cell_of(sprite.rect.center)
+        self.sprite_cells[sprite] = cell
+        self.cells.setdefault(cell, {})[sprite] = None
+
+    def remove(self, sprite):
+        cell = self.sprite_cells.pop(sprite, None)
+        if cell is None:
+            return
+
+        bucket = self.cells[cell]
+        del bucket[sprite]
+        if not bucket:
+            del self.cells[cell]
+
+    def update(self, sprite):
+        old_cell = self.sprite_cells.get(sprite)
+        if old_cell is None:
+            return
+
+        new_cell = self.cell_of(sprite.rect.center)
+        if new_cell == old_cell:
+            return
+
+        bucket = self.cells[old_cell]
+        del bucket[sprite]
+        if not bucket:
+            del self.cells[old_cell]
+
+        self.sprite_cells[sprite] = new_cell
+        self.cells.setdefault(new_cell, {})[sprite] = None
+
+    def cell_ranks(self):
+        """{sprite: position within its cell}, the arrival order queries return sprites in."""
+        return {sprite: rank for bucket in self.cells.values() for rank, sprite in enumerate(bucket)}
+
+    def reorder_cells(self, rank):
+        """Sort the sprites of every cell by rank(sprite), to bring back the order of cell_ranks."""
+        for cell, bucket in self.cells.items():
+            self.cells[cell] = dict.fromkeys(sorted(bucket, key=rank))
+
+    def _candidates(self, left, top, right, bottom):
+        min_col, min_row = self.cell_of((left, top))
+        max_col, max_row = self.cell_of((right, bottom))
+        cells = self.cells
+
+        for col in range(min_col, max_col + 1):
+            for row in range(min_row, max_row + 1):
+                bucket = cells.get((col, row))
+                if bucket:
+                    yield from bucket
+
+    def query_radius(self, pos, radius):
+        """Sprites whose rect center lies within radius of pos."""
+        x, y = pos
+        r2 = radius * radius
+
+        found = []
+        for sprite in self._candidates(x - radius, y - radius, x + radius, y + radius):
+            cx, cy = sprite.rect.center
+            if (cx - x) ** 2 + (cy - y) ** 2 <= r2:
+                found.append(sprite)
+
+        return found
+
+    def query_rect(self, rect, margin=None):
+        """Sprites whose rect overlaps rect.
+
+        Only sprites with a center inside rect grown by margin are considered.
+        The default margin is the largest sprite side seen so far.
+        """
+        rect = pygame.Rect(rect)
+        if margin is None:
+            margin = self.max_extent
+
+        candidates = self._candidates(
+            rect.left - margin, rect.top - margin, rect.right + margin, rect.bottom + margin
+        )
+        return [sprite for sprite in candidates if rect.colliderect(sprite.rect)]
+
+
+class SpatialGroup(pygame.sprite.Group):
+    """Sprite group that keeps a SpatialHash in sync with its members.
+
+    Other per-member indexes with insert/remove methods can be attached with
+    add_index and are kept in sync the same way.
+    """
+
+    def __init__(self, *sprites, cell_size=64):
+        self.grid = SpatialHash(cell_size)
+        self.indexes = [self.grid]
+        # insertion sequence, lets grid queries come back in group (draw) order
+        self._seq = {}
+        self._counter = itertools.count()
+        super().__init__(*sprites)
+
+    def add_index(self, index):
+        for sprite in self.sprites():
+            index.insert(sprite)
+        self.indexes.append(index)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self._seq[sprite] = next(self._counter)
+        for index in self.indexes:
+            index.insert(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        del self._seq[sprite]
+        for index in self.indexes:
+            index.remove(sprite)
+
+    def update_position(self, sprite):
+        self.grid.update(sprite)
+
+    def query_radius(self, pos, radius):
+        return self.grid.query_radius(pos, radius)
+
+    def query_rect(self, rect, margin=None):
+        return self.grid.query_rect(rect, margin)
+
+    def sprites_in_rect(self, rect):
+        """Like query_rect, but in the order the group itself iterates."""
+        return sorted(self.grid.query_rect(rect), key=self._seq.__getitem__)
@@ -0,0 +1,250 @@
+import numpy as np
+import pygame
+
+
+class SteeringBatch:
+    """Enemy movement in one vectorized pass.
+
+    Mirrors _BaseEnemy._move_into_player_range and _separation_vec: seek or
+    flee to stay inside the [min, max] distance band around the player,
+    boids-style separation and soft edge avoidance. Positions live in the
+    arrays here and are written back to the sprites after each step, so
+    separation sees every enemy at its start-of-frame position instead of
+    the partially updated positions the per-sprite loop uses.
+
+    Speeds, distance band and size are copied from the sprite on insert,
+    call sync after changing any of them on an enemy.
+    """
+
+    def __init__(self, separation_radius=30, separation_strength=0.5, edge_margin=60, edge_strength=1.0, capacity=256):
+        self.separation_radius = separation_radius
+        self.separation_strength = separation_strength
+        self.edge_margin = edge_margin
+        self.edge_strength = edge_strength
+
+        self.enemies = []
+        self.slots = {}
+
+        self.pos = np.zeros((capacity, 2))
+        self.half_size = np.zeros((capacity, 2))
+        self.move_speed = np.zeros(capacity)
+        self.backoff_move_speed = np.zeros(capacity)
+        self.min_distance = np.zeros(capacity)
+        self.max_distance = np.zeros(capacity)
+
+    def __len__(self):
+        return len(self.enemies)
+
+    def _grow(self):
+        capacity = len(self.move_speed) * 2
+        for name in ("pos", "half_size", "move_speed", "backoff_move_speed", "min_distance", "max_distance"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:])
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def insert(self, enemy):
+        if len(self.enemies) == len(self.move_speed):
+            self._grow()
+
+        ix = len(self.enemies)
+        self.enemies.append(enemy)
+        self.slots[enemy] = ix
+        self._copy(ix, enemy)
+
+    def sync(self, enemy):
+        """Copy enemy's position, speeds, distance band and size into the arrays again."""
+        ix = self.slots.get(enemy)
+        if ix is not None:
+            self._copy(ix, enemy)
+
+    def _copy(self, ix, enemy):
+        self.pos[ix] = enemy.pos
+        self.half_size[ix] = (enemy.rect.width // 2, enemy.rect.height // 2)
+        self.move_speed[ix] = enemy.move_speed
+        self.backoff_move_speed[ix] = enemy.backoff_move_speed
+        self.min_distance[ix] = enemy.min_distance_to_player
+        self.max_distance[ix] = enemy.max_distance_to_player
+
+    def remove(self, enemy):
+        ix = self.slots.pop(enemy, None)
+        if ix is None:
+            return
+
+        # swap the last enemy into the freed slot to keep the arrays dense
+        last = len(self.enemies) - 1
+        if ix != last:
+            moved = self.enemies[last]
+            self.enemies[ix] = moved
+            self.slots[moved] = ix
+            for arr in (self.pos, self.half_size, self.move_speed, self.backoff_move_speed, self.min_distance, self.max_distance):
+                arr[ix] = arr[last]
+
+        self.enemies.pop()
+
+    def reorder(self, rank):
+        """Reassign slots in the order of rank(enemy), to bring back the slot order of a snapshot."""
+        enemies = sorted(self.enemies, key=rank)
+        self.enemies = []
+        self.slots = {}
+        for enemy in enemies:
+            self.insert(enemy)
+
+    def _separation(self, pos, active, w, h):
+        """Mean of offset / d^2 over neighbors closer than the separation radius."""
+        n = len(pos)
+        radius = self.separation_radius
+        r2 = radius * radius
+
+        # bucket into a dense grid of radius-sized cells with a one cell border,
+        # so every neighbor key of an in-bounds cell is a valid index
+        n_cols = int(w // radius) + 3
+        n_rows = int(h // radius) + 3
+        cells = np.floor(pos / radius).astype(np.int64) + 1
+        np.clip(cells, 1, (n_cols - 2, n_rows - 2), out=cells)
+        keys = cells[:, 1] * n_cols + cells[:, 0]
+        order = np.argsort(keys, kind="stable")
+        cell_starts = np.zeros(n_rows * n_cols + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=n_rows * n_cols), out=cell_starts[1:])
+
+        # with most enemies moving every close pair is visited once and counts for both,
+        # with few only the moving enemies look at their neighbors
+        symmetric = 2 * len(active) > n
+        if symmetric:
+            i_ix, j_ix = _forward_pairs(keys, order, cell_starts, n_cols)
+        else:
+            i_ix, j_ix = _neighbor_pairs(active, keys, order, cell_starts, n_cols)
+
+        # 1d gathers on contiguous coordinates are much cheaper than on (n, 2) rows
+        x = np.ascontiguousarray(pos[:, 0])
+        y = np.ascontiguousarray(pos[:, 1])
+        off_x = x[i_ix] - x[j_ix]
+        off_y = y[i_ix] - y[j_ix]
+        d2 = off_x * off_x + off_y * off_y
+        close = np.flatnonzero((d2 > 0) & (d2 < r2))
+
+        i_ix = i_ix[close]
+        inv_d2 = 1.0 / d2[close]
+        push_x = off_x[close] * inv_d2
+        push_y = off_y[close] * inv_d2
+        sep = np.empty((n, 2))
+        sep[:, 0] = np.bincount(i_ix, weights=push_x, minlength=n)
+        sep[:, 1] = np.bincount(i_ix, weights=push_y, minlength=n)
+        count = np.bincount(i_ix, minlength=n)
+        if symmetric:
+            j_ix = j_ix[close]
+            sep[:, 0] -= np.bincount(j_ix, weights=push_x, minlength=n)
+            sep[:, 1] -= np.bincount(j_ix, weights=push_y, minlength=n)
+            count += np.bincount(j_ix, minlength=n)
+
+        # without neighbors the sums are 0 already
+        sep /= np.maximum(count, 1)[:, None]
+        return sep
+
+    def _edge_avoidance(self, pos, w, h):
+        margin = self.edge_margin
+        x = pos[:, 0]
+        y = pos[:, 1]
+
+        edge = np.zeros_like(pos)
+        edge[:, 0] += np.where(x < margin, 1.0 / np.maximum(x, 1), 0.0)
+        edge[:, 0] -= np.where(x > w - margin, 1.0 / np.maximum(w - x, 1), 0.0)
+        edge[:, 1] += np.where(y < margin, 1.0 / np.maximum(y, 1), 0.0)
+        edge[:, 1] -= np.where(y > h - margin, 1.0 / np.maximum(h - y, 1), 0.0)
+
+        return _normalized(edge) * self.edge_strength
+
+    def step(self, dt, world):
+        n = len(self.enemies)
+        if n == 0:
+            return
+
+        pos = self.pos[:n]
+        aggro = np.fromiter((enemy.is_aggro for enemy in self.enemies), bool, n)
+
+        diff = np.asarray(world.get_player().pos) - pos
+        dist = np.hypot(diff[:, 0], diff[:, 1])
+        active = np.flatnonzero(aggro & (dist > 0))
+        if len(active) == 0:
+            return
+
+        dist = dist[active]
+        dir_to_player = diff[active] / dist[:, None]
+
+        too_close = dist < self.min_distance[active]
+        too_far = ~too_close & (dist > self.max_distance[active])
+        desired = np.zeros_like(dir_to_player)
+        desired[too_close] = -dir_to_player[too_close]
+        desired[too_far] = dir_to_player[too_far]
+        speed = np.where(too_close, self.backoff_move_speed[active], self.move_speed[active])
+
+        sep = self._separation(pos, active, world.max_width, world.max_height)[active]
+        sep += self._edge_avoidance(pos[active], world.max_width, world.max_height)
+        sep = _normalized(sep) * self.separation_strength
+
+        steer = desired + sep
+        moving = np.einsum("ij,ij->i", steer, steer) > 0
+        active = active[moving]
+        if len(active) == 0:
+            return
+
+        step = _normalized(steer[moving]) * (speed[moving] * dt)[:, None]
+        half = self.half_size[active]
+        bounds = np.array([world.max_width, world.max_height])
+        old_pos = pos[active]
+        new_pos = np.clip(old_pos + step, half, bounds - half)
+        pos[active] = new_pos
+
+        # rect centers truncate like pygame does, only re-bucket on a cell change
+        grid = world.enemies.grid
+        cell_size = grid.cell_size
+        rebucket = np.any(
+            np.floor(old_pos) // cell_size != np.floor(new_pos) // cell_size, axis=1
+        ).tolist()
+
+        # write back, the rest of the game still reads sprite positions
+        enemies = self.enemies
+        vector = pygame.Vector2
+        for ix, (x, y), changed_cell in zip(active.tolist(), new_pos.tolist(), rebucket):
+            enemy = enemies[ix]
+            enemy.pos = vector(x, y)
+            enemy.rect.center = (x, y)
+            if changed_cell:
+                grid.update(enemy)
+
+
+def _expand_runs(owners, start, counts, order):
+    """(i, j) pairs, owners[k] paired with the counts[k] enemies at order[start[k]:]."""
+    total = counts.sum()
+    i_ix = np.repeat(owners, counts)
+    # the m-th pair of a run sits at start + m in order
+    run_shift = np.repeat(start - (np.cumsum(counts) - counts), counts)
+    return i_ix, order[np.arange(total) + run_shift]
+
+
+def _neighbor_pairs(active, keys, order, cell_starts, n_cols):
+    """Every active enemy with everything in its nine surrounding cells, itself included."""
+    offsets = np.array([dy * n_cols + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+    neighbor_keys = (keys[active][None, :] + offsets[:, None]).ravel()
+    start = cell_starts[neighbor_keys]
+    counts = cell_starts[neighbor_keys + 1] - start
+    return _expand_runs(np.tile(active, len(offsets)), start, counts, order)
+
+
+def _forward_pairs(keys, order, cell_starts, n_cols):
+    """Every pair of enemies in the same or adjacent cells once."""
+    n = len(keys)
+    # later enemies of the own cell, then the cells right, below left, below and below right
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n)
+    offsets = np.array([1, n_cols - 1, n_cols, n_cols + 1])
+    forward_keys = (keys[None, :] + offsets[:, None]).ravel()
+    start = np.concatenate((rank + 1, cell_starts[forward_keys]))
+    end = np.concatenate((cell_starts[keys + 1], cell_starts[forward_keys + 1]))
+    return _expand_runs(np.tile(np.arange(n), len(offsets) + 1), start, end - start, order)
+
+
+def _normalized(vecs):
+    length = np.hypot(vecs[:, 0], vecs[:, 1])
+    # zero vectors stay zero
+    return vecs / np.where(length > 0, length, 1.0)[:, None]
@@ -0,0 +1,280 @@
+"""Balance sweeps: headless runs over a parameter grid on a process pool.
+
+    python -m pyarpg.sweep --param fireball_damage=10,15,20 --param ranged_atk_speed=0.5,1 --replicates 4 --out sweep
+
+Every combination of the given values runs replicates times, with seeds
+0 to replicates - 1, using the scripted player of pyarpg.sim. Results are
+streamed into the --out directory as they come in, one array file per
+column of native doubles, described by columns.json. read_columns loads
+them back.
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from pyarpg.enemies import MeleeEnemy
+from pyarpg.enemies import RangedEnemy
+from pyarpg.pickups import DropGlobe
+from pyarpg.sim import LOOT_STORAGE_POS
+from pyarpg.sim import ScriptedInput
+from pyarpg.sim import build_world
+from pyarpg.simulation import step
+from pyarpg.skills import FireballProjectile
+from pyarpg.skills import RingOfFire
+
+# set on every enemy of the class after spawning, with the type the enemies keep them as
+ENEMY_PARAMETERS = {
+    "ranged_aggro_range": (RangedEnemy, "aggro_range", int),
+    "ranged_atk_speed": (RangedEnemy, "atk_speed", float),
+    "ranged_move_speed": (RangedEnemy, "move_speed", int),
+    "ranged_max_hp": (RangedEnemy, "max_hp", int),
+    "melee_aggro_range": (MeleeEnemy, "aggro_range", int),
+    "melee_atk_speed": (MeleeEnemy, "atk_speed", float),
+    "melee_move_speed": (MeleeEnemy, "move_speed", int),
+    "melee_max_hp": (MeleeEnemy, "max_hp", int),
+    "ranged_attack_damage": (RangedEnemy, "attack_damage", int),
+    "melee_attack_damage": (MeleeEnemy, "attack_damage", int),
+}
+
+# class attributes, a worker process runs many sweeps so every run sets all of them. Enemies
+# launch with their own attack_damage, so these only change the player's side
+CLASS_PARAMETERS = {
+    "fireball_damage": (FireballProjectile, "damage"),
+    "ring_of_fire_damage": (RingOfFire, "damage"),
+    "loot_value": (DropGlobe, "loot_value"),
+}
+CLASS_DEFAULTS = {name: getattr(cls, attr) for name, (cls, attr) in CLASS_PARAMETERS.items()}
+
+PARAMETERS = list(ENEMY_PARAMETERS) + list(CLASS_PARAMETERS)
+PARAMETER_TYPES = {name: kind for name, (_, _, kind) in ENEMY_PARAMETERS.items()}
+PARAMETER_TYPES.update((name, type(default)) for name, default in CLASS_DEFAULTS.items())
+
+# jobs per worker when run_sweep picks the chunk size
+CHUNKS_PER_WORKER = 8
+
+RESULT_COLUMNS = [
+    "run",
+    "seed",
+    "loot_count",
+    "kills",
+    "enemies_left",
+    "ttk_mean",
+    "ttk_median",
+    "ttk_max",
+    "damage_taken",
+    "damage_taken_per_s",
+    "wall_seconds",
+]
+
+
+def convert_parameter(name, value):
+    """value as the type the game keeps name in, ValueError for a fraction of an int parameter."""
+    kind = PARAMETER_TYPES[name]
+    if kind is int:
+        if value != int(value):
+            raise ValueError(f"{name} takes whole numbers, got {value}")
+        return int(value)
+    return kind(value)
+
+
+def apply_parameters(world, params):
+    for name, (cls, attr) in CLASS_PARAMETERS.items():
+        value = params.get(name)
+        setattr(cls, attr, CLASS_DEFAULTS[name] if value is None else convert_parameter(name, value))
+
+    for name, (cls, attr, _) in ENEMY_PARAMETERS.items():
+        if name not in params:
+            continue
+        value = convert_parameter(name, params[name])
+        for enemy in world.enemies:
+            if type(enemy) is cls:
+                setattr(enemy, attr, value)
+                if attr == "max_hp":
+                    enemy.current_hp = value
+                if world.steering is not None:
+                    world.steering.sync(enemy)
+
+    world.max_aggro_range = max((enemy.aggro_range for enemy in world.enemies), default=0)
+
+
+def run_one(job):
+    """One simulation, returns a row of {column: value}."""
+    run_ix, params, seed, n_enemies, n_ticks, dt = job
+    start = time.perf_counter()
+
+    world, rng = build_world(n_enemies, seed)
+    apply_parameters(world, params)
+    script = ScriptedInput(rng)
+    player = world.get_player()
+
+    first_hit = {}
+    kill_times = []
+    damage_taken = 0
+    for tick in range(n_ticks):
+        script.apply(tick, world)
+        step(world, dt, LOOT_STORAGE_POS)
+        world.sounds.clear()
+
+        log = world.combat_log
+        for target, damage in log.hits:
+            if target is player:
+                damage_taken += damage
+            elif target not in first_hit:
+                first_hit[target] = world.time
+        for target in log.kills:
+            # a kill from a single hit still took that tick
+            kill_times.append(world.time - first_hit.pop(target) + dt)
+
+    duration = n_ticks * dt
+    row = dict(params)
+    row.update(
+        run=run_ix,
+        seed=seed,
+        loot_count=world.player_stats.loot_count,
+        kills=len(kill_times),
+        enemies_left=len(world.enemies),
+        ttk_mean=statistics.fmean(kill_times) if kill_times else float("nan"),
+        ttk_median=statistics.median(kill_times) if kill_times else float("nan"),
+        ttk_max=max(kill_times, default=float("nan")),
+        damage_taken=damage_taken,
+        damage_taken_per_s=damage_taken / duration,
+        wall_seconds=time.perf_counter() - start,
+    )
+    return row
+
+
+class ColumnWriter:
+    """Appends rows to one file of native doubles per column.
+
+    Rows are buffered and written every flush_every rows, columns.json is
+    rewritten on every flush so an interrupted sweep stays readable.
+    """
+
+    def __init__(self, path, columns, flush_every=64):
+        self.path = path
+        self.columns = list(columns)
+        self.flush_every = flush_every
+        self.buffers = {name: array("d") for name in self.columns}
+        self.n_rows = 0
+
+        os.makedirs(path, exist_ok=True)
+        for name in self.columns:
+            open(self._column_path(name), "wb").close()
+        self._write_schema()
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f"{name}.f64")
+
+    def _write_schema(self):
+        schema = {"columns": self.columns, "n_rows": self.n_rows, "typecode": "d", "byteorder": sys.byteorder}
+        with open(os.path.join(self.path, "columns.json"), "w") as f:
+            json.dump(schema, f, indent=2)
+
+    def append(self, row):
+        for name in self.columns:
+            self.buffers[name].append(row[name])
+        if len(self.buffers[self.columns[0]]) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        n_new = len(self.buffers[self.columns[0]])
+        if n_new == 0:
+            return
+
+        for name, buffer in self.buffers.items():
+            with open(self._column_path(name), "ab") as f:
+                buffer.tofile(f)
+            del buffer[:]
+        self.n_rows += n_new
+        self._write_schema()
+
+    def close(self):
+        self.flush()
+
+
+def read_columns(path):
+    """{column: array('d')} of a sweep written by ColumnWriter."""
+    with open(os.path.join(path, "columns.json")) as f:
+        schema = json.load(f)
+
+    columns = {}
+    for name in schema["columns"]:
+        values = array(schema["typecode"])
+        with open(os.path.join(path, f"{name}.f64"), "rb") as f:
+            values.fromfile(f, schema["n_rows"])
+        if schema["byteorder"] != sys.byteorder:
+            values.byteswap()
+        columns[name] = values
+    return columns
+
+
+def make_jobs(grid, replicates=1, n_enemies=200, n_ticks=1800, dt=1 / 60):
+    """One job per combination of grid {name: [values]} and seed."""
+    names = list(grid)
+    jobs = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        for seed in range(replicates):
+            jobs.append((len(jobs), dict(zip(names, values)), seed, n_enemies, n_ticks, dt))
+    return jobs
+
+
+def run_sweep(jobs, out, workers=None, chunksize=None):
+    """Runs jobs on a process pool and streams their rows to out, returns the number of rows.
+
+    Jobs go to the workers in chunks of chunksize, by default the jobs are
+    split into CHUNKS_PER_WORKER chunks per worker.
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        # big enough to keep pickling overhead low, small enough to balance the workers
+        chunksize = max(1, len(jobs) // (workers * CHUNKS_PER_WORKER))
+
+    param_names = list(jobs[0][1]) if jobs else []
+    writer = ColumnWriter(out, param_names + RESULT_COLUMNS)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for row in executor.map(run_one, jobs, chunksize=chunksize):
+            writer.append(row)
+    writer.close()
+    return writer.n_rows
+
+
+def _parse_param(text):
+    name, _, values = text.partition("=")
+    if name not in PARAMETERS:
+        raise argparse.ArgumentTypeError(f"unknown parameter {name}, known: {', '.join(PARAMETERS)}")
+    try:
+        numbers = [float(value) for value in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"values of {name} must be numbers separated by commas")
+    try:
+        return name, [convert_parameter(name, number) for number in numbers]
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless balance sweeps on a process pool.")
+    parser.add_argument("--param", type=_parse_param, action="append", default=[], metavar="NAME=V1,V2,...")
+    parser.add_argument("--replicates", type=int, default=4, help="seeds per combination")
+    parser.add_argument("--enemies", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=1800)
+    parser.add_argument("--dt", type=float, default=1 / 60)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, all cores by default")
+    parser.add_argument("--out", default="sweep", help="directory for the column files")
+    args = parser.parse_args()
+
+    jobs = make_jobs(dict(args.param), replicates=args.replicates, n_enemies=args.enemies, n_ticks=args.ticks, dt=args.dt)
+    start = time.perf_counter()
+    n_rows = run_sweep(jobs, args.out, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"{n_rows} runs in {elapsed:.1f}s ({n_rows / elapsed:.2f} runs/s), columns in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Fixed-rate simulation clock and render interpolation.
+
+The game loop feeds the real frame time into FixedTimestep, runs as many
+fixed ticks as it hands back and then draws with PositionHistory blending
+every sprite between where it was before the last tick and where it is now.
+"""
+from pyarpg.spatial import SpatialGroup
+
+
+class FixedTimestep:
+    """Accumulates frame time and hands it out in ticks of 1 / tick_rate seconds.
+
+    At most max_ticks_per_frame ticks run per frame, time beyond that is
+    dropped so a slow frame slows the game down instead of spiralling into
+    ever longer catch-up frames.
+    """
+
+    def __init__(self, tick_rate=60, max_ticks_per_frame=5):
+        self.tick_dt = 1 / tick_rate
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.accumulator = 0.0
+        self.dropped_time = 0.0
+
+    def advance(self, frame_dt):
+        """Add frame_dt seconds, returns the number of ticks to run now."""
+        self.accumulator += frame_dt
+        n_ticks = int(self.accumulator / self.tick_dt)
+        if n_ticks > self.max_ticks_per_frame:
+            dropped = (n_ticks - self.max_ticks_per_frame) * self.tick_dt
+            self.dropped_time += dropped
+            self.accumulator -= dropped
+            n_ticks = self.max_ticks_per_frame
+
+        self.accumulator -= n_ticks * self.tick_dt
+        return n_ticks
+
+    @property
+    def alpha(self):
+        """How far the clock is into the next tick, from 0 to 1."""
+        return max(0.0, min(self.accumulator / self.tick_dt, 1.0))
+
+
+class PositionHistory:
+    """Sprite and camera positions from before the latest tick.
+
+    Call record before every tick. Sprites that did not exist at the last
+    record are drawn where they are, and so are sprites that moved more
+    than margin in one tick (a pooled sprite reused somewhere else). Only
+    sprites of the spatial groups near the view are recorded, margin should
+    cover how far anything moves in one tick. Positions are rect centers,
+    which stay put when a sprite's image changes size.
+    """
+
+    def __init__(self, margin=64):
+        self.margin = margin
+        self.alpha = 1.0
+        self._world = {}
+        self._screen = {}
+        self._camera_offset = None
+
+    def record(self, world):
+        camera = world.camera
+        view = camera.rect.inflate(2 * self.margin, 2 * self.margin)
+        groups = (
+            world.players,
+            world.active_player_skills,
+            world.active_player_ground_skills,
+            world.active_enemy_skills,
+            world.enemies,
+            world.pickups_waiting,
+        )
+
+        positions = {}
+        for group in groups:
+            if isinstance(group, SpatialGroup) and not camera.covers_world:
+                group = group.grid.query_rect(view)
+            positions.update((sprite, sprite.rect.center) for sprite in group)
+
+        self._world = positions
+        # collected pickups live in screen space, keep them apart from the world
+        self._screen = {sprite: sprite.rect.center for sprite in world.pickups_collected}
+        self._camera_offset = camera.offset
+
+    def clear(self):
+        self._world = {}
+        self._screen = {}
+        self._camera_offset = None
+
+    def camera_offset(self, camera):
+        if self._camera_offset is None:
+            return camera.offset
+
+        return _lerp(self._camera_offset, camera.offset, self.alpha)
+
+    def _shift(self, positions):
+        alpha = self.alpha
+        margin = self.margin
+
+        def shift(sprite):
+            prev = positions.get(sprite)
+            if prev is None:
+                return 0, 0
+
+            x, y = sprite.rect.center
+            if abs(x - prev[0]) > margin or abs(y - prev[1]) > margin:
+                return 0, 0
+
+            lx, ly = _lerp(prev, (x, y), alpha)
+            return lx - x, ly - y
+
+        return shift
+
+    def world_shift(self):
+        """Callable giving the (dx, dy) to add to a world sprite's rect."""
+        return self._shift(self._world)
+
+    def screen_shift(self):
+        return self._shift(self._screen)
+
+
+def _lerp(a, b, alpha):
+    return round(a[0] + (b[0] - a[0]) * alpha), round(a[1] + (b[1] - a[1]) * alpha)
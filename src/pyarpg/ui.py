@@ -2,6 +2,7 @@ import pygame
 from pyarpg.world import World
 from pyarpg.assets import SPRITE_DICT
 from pyarpg.assets import FONT_DICT
+from pyarpg.assets import convert_for_display
 
 
 def draw_enemy_hp_bars(world, screen, width: int = 28, height: int = 6, y_offset: int = 13):
@@ -24,6 +25,67 @@ def draw_enemy_hp_bars(world, screen, width: int = 28, height: int = 6, y_offset
         # border
         pygame.draw.rect(screen, (10, 10, 10), bg_rect, 1)
 
+class EnemyHPBarRenderer:
+    """Enemy HP bars from pre-rendered surfaces, one per filled pixel width.
+
+    Only enemies that took a hit get a bar. They are picked up from the
+    CombatLog handed to record after every tick, so drawing never looks at
+    the undamaged ones. All bars of a frame are submitted in one blits call.
+    """
+
+    def __init__(self, width: int = 28, height: int = 6, y_offset: int = 13):
+        self.width = width
+        self.y_offset = y_offset
+        self.bars = [self._render_bar(fill_width, height) for fill_width in range(width + 1)]
+        # enemies with a bar, in the order they were first hit
+        self.damaged = {}
+
+    def record(self, log, enemies):
+        """Track the enemies hit in a CombatLog, enemies is the group they belong to."""
+        damaged = self.damaged
+        for target, _ in log.hits:
+            # the player is hit too, and killed enemies already left the group
+            if target in enemies:
+                damaged[target] = None
+        for target in log.kills:
+            damaged.pop(target, None)
+
+    def clear(self):
+        self.damaged.clear()
+
+    def _render_bar(self, fill_width, height):
+        bar = pygame.Surface((self.width, height))
+        bg_rect = bar.get_rect()
+        pygame.draw.rect(bar, (60, 60, 60), bg_rect)
+        pygame.draw.rect(bar, (200, 50, 50), pygame.Rect(0, 0, fill_width, height))
+        pygame.draw.rect(bar, (10, 10, 10), bg_rect, 1)
+        return convert_for_display(bar)
+
+    def blit_sequence(self, enemies, offset=(0, 0), shift=None):
+        """Bars for enemies out of damaged, offset and shift work like in RenderQueue.add_group."""
+        width = self.width
+        half_width = width // 2
+        ox, oy = offset
+        y_offset = self.y_offset + oy
+        bars = self.bars
+
+        blit_seq = []
+        for enemy in enemies:
+            hp = max(0.0, min(1.0, enemy.hp_percent))
+            rect = enemy.rect
+            x = rect.centerx - half_width - ox
+            y = rect.top - y_offset
+            if shift is not None:
+                dx, dy = shift(enemy)
+                x += dx
+                y += dy
+            blit_seq.append((bars[int(width * hp)], (x, y)))
+
+        return blit_seq
+
+    def draw(self, world, screen):
+        screen.blits(self.blit_sequence(self.damaged), doreturn=False)
+
 class BottomUIBar(pygame.sprite.Sprite):
     def __init__(self, screen_w, screen_h, n_skills=3, inside_margin=8, outside_margin=8, loot_slot_width=64, loot_count_init=0):
         super().__init__()
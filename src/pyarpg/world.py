@@ -1,22 +1,108 @@
 import pygame
 
+from pyarpg.aggro import AggroTracker
+from pyarpg.audio import SoundManager
+from pyarpg.combat import CombatLog
+from pyarpg.combat import CombatQueue
+from pyarpg.enemies import AIScheduler
+from pyarpg.profiler import FrameProfiler
+from pyarpg.projectiles import ProjectileBatch
+from pyarpg.spatial import SpatialGroup
+from pyarpg.steering import SteeringBatch
+
+
+class Camera:
+    """Viewport into the world, maps between world and screen coordinates."""
+
+    def __init__(self, view_size, world_size):
+        self.rect = pygame.Rect((0, 0), view_size)
+        self.world_rect = pygame.Rect((0, 0), world_size)
+
+    @property
+    def offset(self):
+        return self.rect.topleft
+
+    @property
+    def covers_world(self):
+        return self.rect.contains(self.world_rect)
+
+    def follow(self, pos):
+        self.rect.center = (round(pos[0]), round(pos[1]))
+        self.rect.clamp_ip(self.world_rect)
+
+    def world_to_screen(self, pos):
+        return pygame.Vector2(pos[0] - self.rect.x, pos[1] - self.rect.y)
+
+    def screen_to_world(self, pos):
+        return pygame.Vector2(pos[0] + self.rect.x, pos[1] + self.rect.y)
+
+    def is_visible(self, rect):
+        return self.rect.colliderect(rect)
+
 
 class World:
-    def __init__(self, screen, player_stats):
-        self.max_width = screen.width
-        self.max_height = screen.height
+    def __init__(
+            self,
+            screen,
+            player_stats,
+            cell_size=64,
+            batch_steering=False,
+            world_size=None,
+            batch_projectiles=False,
+            ai_lod=False,
+        ):
+        if world_size is None:
+            world_size = (screen.width, screen.height)
+
+        self.max_width, self.max_height = world_size
+        self.camera = Camera((screen.width, screen.height), world_size)
         self.players = pygame.sprite.GroupSingle()
-        self.enemies = pygame.sprite.Group()
-        
+        self.enemies = SpatialGroup(cell_size=cell_size)
+        self.max_aggro_range = 0
+        # game time in seconds, advanced by simulation.update_world
+        self.time = 0.0
+
+        self.aggro = AggroTracker()
+        self.enemies.add_index(self.aggro)
+
+        # batch mode moves all enemies in one vectorized pass in steer_enemies
+        self.steering = None
+        if batch_steering:
+            self.steering = SteeringBatch()
+            self.enemies.add_index(self.steering)
+
+        # level of detail mode updates far and idle enemies less often
+        self.ai = None
+        if ai_lod:
+            self.ai = AIScheduler()
+            self.enemies.add_index(self.ai)
+
         self.active_player_skills = pygame.sprite.Group()
         self.active_enemy_skills = pygame.sprite.Group()
         self.active_player_ground_skills = pygame.sprite.Group()
 
-        self.pickups_waiting = pygame.sprite.Group()
+        # batch mode keeps projectiles in arrays instead of the skill groups
+        self.player_projectiles = None
+        self.enemy_projectiles = None
+        if batch_projectiles:
+            self.player_projectiles = ProjectileBatch()
+            self.enemy_projectiles = ProjectileBatch()
+
+        self.pickups_waiting = SpatialGroup(cell_size=cell_size)
         self.pickups_collected = pygame.sprite.Group()
 
         self.player_stats = player_stats
 
+        # sounds requested during a frame, played by sounds.flush()
+        self.sounds = SoundManager()
+
+        # hits of a tick are applied together, the log tells audio and UI what happened
+        self.combat = CombatQueue()
+        self.combat_log = CombatLog()
+
+        # disabled until the game loop opts in, scopes then cost next to nothing
+        self.profiler = FrameProfiler()
+
     @property
     def player(self):
         return self.players.sprite
@@ -24,9 +110,18 @@ class World:
     def get_enemies(self):
         return self.enemies
 
+    def get_enemies_in_radius(self, pos, radius):
+        return self.enemies.query_radius(pos, radius)
+
+    def get_enemies_in_rect(self, rect):
+        return self.enemies.query_rect(rect)
+
+    def get_pickups_in_rect(self, rect):
+        return self.pickups_waiting.query_rect(rect)
+
     def get_player(self):
         return self.player
-    
+
     def get_player_group(self):
         return self.players
 
@@ -41,10 +136,11 @@ class World:
 
     def add_enemy(self, enemy):
         self.enemies.add(enemy)
-    
+        self.max_aggro_range = max(self.max_aggro_range, enemy.aggro_range)
+
     def add_player(self, player):
         self.players.add(player)
-    
+
     def add_active_enemy_skill(self, skill):
         self.active_enemy_skills.add(skill)
 
@@ -53,7 +149,25 @@ class World:
 
     def add_pickup(self, pickup):
         self.pickups_waiting.add(pickup)
-    
+
     def add_active_player_ground_skill(self, skill):
         self.active_player_ground_skills.add(skill)
 
+    def launch_player_projectile(self, projectile_cls, start_pos, aimed_target_pos, damage=None):
+        if self.player_projectiles is not None:
+            self.player_projectiles.launch(projectile_cls, start_pos, aimed_target_pos, damage)
+        else:
+            self.add_active_player_skill(projectile_cls.acquire(start_pos, aimed_target_pos, damage))
+
+    def launch_enemy_projectile(self, projectile_cls, start_pos, aimed_target_pos, damage=None):
+        if self.enemy_projectiles is not None:
+            self.enemy_projectiles.launch(projectile_cls, start_pos, aimed_target_pos, damage)
+        else:
+            self.add_active_enemy_skill(projectile_cls.acquire(start_pos, aimed_target_pos, damage))
+
+    def update_aggro(self):
+        self.aggro.update(self)
+
+    def steer_enemies(self, dt):
+        if self.steering is not None:
+            self.steering.step(dt, self)
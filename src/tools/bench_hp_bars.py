@@ -0,0 +1,62 @@
+"""Compare draw_enemy_hp_bars with EnemyHPBarRenderer.
+
+    python src/tools/bench_hp_bars.py
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import random
+import time
+
+import pygame
+
+pygame.init()
+pygame.display.set_mode((1600, 900))
+
+from pyarpg.world import World
+from pyarpg.stats import PlayerStats
+from pyarpg.player import Player
+from pyarpg.level import spawn_random_enemies
+from pyarpg.ui import draw_enemy_hp_bars
+from pyarpg.ui import EnemyHPBarRenderer
+
+
+def build_world(screen, n_enemies, damaged_share, seed=0):
+    rng = random.Random(seed)
+    world = World(screen, PlayerStats())
+    world.add_player(Player(pos=(800, 450)))
+    spawn_random_enemies(world, n_enemies=n_enemies, rng=rng)
+
+    for enemy in world.enemies:
+        if rng.random() < damaged_share:
+            enemy.current_hp = rng.randint(1, enemy.max_hp - 1)
+
+    return world
+
+
+def time_draw(draw, world, screen, n_frames):
+    best = float("inf")
+    for _ in range(n_frames):
+        start = time.perf_counter()
+        draw(world, screen)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(n_frames=50):
+    screen = pygame.Surface((1600, 900))
+    renderer = EnemyHPBarRenderer()
+
+    print(f"{'enemies':>8} {'damaged':>8} {'old ms':>8} {'new ms':>8} {'speedup':>8}")
+    for n_enemies in (500, 2000):
+        for damaged_share in (0.1, 0.5, 1.0):
+            world = build_world(screen, n_enemies, damaged_share)
+            old_ms = time_draw(draw_enemy_hp_bars, world, screen, n_frames)
+            new_ms = time_draw(renderer.draw, world, screen, n_frames)
+            print(f"{n_enemies:>8} {damaged_share:>8.0%} {old_ms:>8.3f} {new_ms:>8.3f} {old_ms / new_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
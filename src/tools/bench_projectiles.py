@@ -0,0 +1,67 @@
+"""Compare sprite projectiles with ProjectileBatch in a projectile storm.
+
+    python src/tools/bench_projectiles.py
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import random
+import time
+
+import pygame
+
+pygame.init()
+pygame.display.set_mode((1600, 900))
+
+from pyarpg.world import World
+from pyarpg.stats import PlayerStats
+from pyarpg.player import Player
+from pyarpg.level import spawn_random_enemies
+from pyarpg.skills import FireballProjectile
+from pyarpg.simulation import update_world
+from pyarpg.simulation import resolve_collisions
+
+LOOT_STORAGE_POS = (800, 860)
+
+
+def build_world(n_enemies, batch_projectiles, seed=0):
+    world = World(pygame.Rect(0, 0, 1600, 900), PlayerStats(), batch_projectiles=batch_projectiles)
+    world.add_player(Player(pos=(800, 450)))
+    spawn_random_enemies(world, n_enemies=n_enemies, rng=random.Random(seed))
+    return world
+
+
+def time_storm(n_projectiles, n_enemies, batch_projectiles, n_ticks=60, dt=1 / 60, seed=0):
+    """Keep n_projectiles in flight, returns ms per tick for movement plus hits."""
+    rng = random.Random(seed)
+    world = build_world(n_enemies, batch_projectiles, seed)
+    player = world.get_player()
+
+    def live():
+        if batch_projectiles:
+            return len(world.player_projectiles)
+        return len(world.active_player_skills)
+
+    start = time.perf_counter()
+    for _ in range(n_ticks):
+        for _ in range(n_projectiles - live()):
+            aimed = pygame.Vector2(rng.uniform(0, 1600), rng.uniform(0, 900))
+            world.launch_player_projectile(FireballProjectile, player.pos, aimed)
+        update_world(world, dt)
+        resolve_collisions(world, LOOT_STORAGE_POS)
+    return (time.perf_counter() - start) / n_ticks * 1000
+
+
+def main():
+    print(f"{'projectiles':>12} {'enemies':>8} {'sprites ms':>11} {'batch ms':>9} {'speedup':>8}")
+    for n_projectiles in (500, 5000):
+        for n_enemies in (100, 1000):
+            sprite_ms = time_storm(n_projectiles, n_enemies, batch_projectiles=False)
+            batch_ms = time_storm(n_projectiles, n_enemies, batch_projectiles=True)
+            print(f"{n_projectiles:>12} {n_enemies:>8} {sprite_ms:>11.2f} {batch_ms:>9.2f} {sprite_ms / batch_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
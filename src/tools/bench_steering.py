@@ -0,0 +1,66 @@
+"""Compare the per-sprite enemy movement with SteeringBatch.
+
+    python src/tools/bench_steering.py
+
+Every enemy is aggro, so every one of them moves each tick. Only the
+movement pass is timed: _move_into_player_range per enemy against one
+SteeringBatch.step.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import math
+import random
+import time
+
+import pygame
+
+pygame.init()
+pygame.display.set_mode((1600, 900))
+
+from pyarpg.world import World
+from pyarpg.stats import PlayerStats
+from pyarpg.player import Player
+from pyarpg.level import spawn_random_enemies
+
+SCREEN_SIZE = (1600, 900)
+
+
+def build_world(n_enemies, batch_steering, world_screens, seed=0):
+    world_size = (SCREEN_SIZE[0] * world_screens, SCREEN_SIZE[1] * world_screens)
+    world = World(pygame.Rect((0, 0), SCREEN_SIZE), PlayerStats(), batch_steering=batch_steering, world_size=world_size)
+    world.add_player(Player(pos=(world_size[0] // 2, world_size[1] // 2)))
+    spawn_random_enemies(world, n_enemies=n_enemies, rng=random.Random(seed))
+    for enemy in world.enemies:
+        enemy.aggro_time = math.inf
+        world.aggro.on_hit(enemy, world, propagate=False)
+    return world
+
+
+def time_movement(n_enemies, batch_steering, world_screens, n_ticks=60, dt=1 / 60):
+    """ms per tick of moving every enemy."""
+    world = build_world(n_enemies, batch_steering, world_screens)
+    enemies = list(world.enemies)
+
+    start = time.perf_counter()
+    for _ in range(n_ticks):
+        if batch_steering:
+            world.steer_enemies(dt)
+        else:
+            for enemy in enemies:
+                enemy._move_into_player_range(dt, world)
+    return (time.perf_counter() - start) / n_ticks * 1000
+
+
+def main():
+    print(f"{'enemies':>8} {'screens':>8} {'sprites ms':>11} {'batch ms':>9} {'speedup':>8}")
+    for n_enemies, world_screens in ((1000, 1), (2000, 1), (5000, 2)):
+        sprite_ms = time_movement(n_enemies, False, world_screens)
+        batch_ms = time_movement(n_enemies, True, world_screens)
+        print(f"{n_enemies:>8} {world_screens:>8} {sprite_ms:>11.2f} {batch_ms:>9.2f} {sprite_ms / batch_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
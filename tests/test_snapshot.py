@@ -0,0 +1,90 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import random
+
+import pygame
+import pytest
+
+from pyarpg import snapshot
+from pyarpg.sim import LOOT_STORAGE_POS
+from pyarpg.sim import WORLD_SIZE
+from pyarpg.sim import ScriptedInput
+from pyarpg.sim import build_world
+from pyarpg.simulation import step
+
+DT = 1 / 60
+
+MODES = [
+    {},
+    {"batch_steering": True},
+    {"batch_projectiles": True},
+    {"ai_lod": True},
+    {"batch_steering": True, "batch_projectiles": True, "ai_lod": True},
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def display():
+    pygame.init()
+    pygame.display.set_mode(WORLD_SIZE)
+    yield
+    pygame.quit()
+
+
+def run(world, scripted, ticks, start=0):
+    for tick in range(start, start + ticks):
+        scripted.apply(tick, world)
+        step(world, DT, LOOT_STORAGE_POS)
+
+
+def played_world(mode, ticks=200):
+    world, rng = build_world(100, 4, **mode)
+    if world.ai is not None:
+        # a time budget would make the schedule depend on how fast the machine is
+        world.ai.budget_ms = None
+    scripted = ScriptedInput(rng)
+    run(world, scripted, ticks)
+    return world, rng, scripted
+
+
+@pytest.mark.parametrize("mode", MODES, ids=lambda mode: "+".join(mode) or "sprites")
+def test_restored_world_plays_on_identically(mode, tmp_path):
+    world, rng, scripted = played_world(mode)
+    path = tmp_path / "world.snap"
+    snapshot.save(world, path)
+
+    snap = snapshot.load(path)
+    restored = snapshot.restore(snap, pygame.Rect((0, 0), WORLD_SIZE))
+    snap.release()
+    assert snapshot.snapshot(restored) == snapshot.snapshot(world)
+
+    restored_rng = random.Random()
+    restored_rng.setstate(rng.getstate())
+    restored_scripted = ScriptedInput(restored_rng)
+    for tick in range(200, 600):
+        run(world, scripted, 1, start=tick)
+        run(restored, restored_scripted, 1, start=tick)
+        assert snapshot.snapshot(restored) == snapshot.snapshot(world), f"worlds differ after tick {tick}"
+
+
+def test_load_rejects_other_versions():
+    world, _, _ = played_world({}, ticks=10)
+    data = bytearray(snapshot.snapshot(world))
+    magic, version, *rest = snapshot.HEADER.unpack_from(data)
+    snapshot.HEADER.pack_into(data, 0, magic, version + 1, *rest)
+
+    with pytest.raises(ValueError, match="version"):
+        snapshot.Snapshot(bytes(data))
+
+
+def test_load_rejects_other_field_counts():
+    world, _, _ = played_world({}, ticks=10)
+    data = bytearray(snapshot.snapshot(world))
+    name, n_rows, n_fields, offset = snapshot.SECTION.unpack_from(data, snapshot.HEADER.size)
+    snapshot.SECTION.pack_into(data, snapshot.HEADER.size, name, n_rows, n_fields - 1, offset)
+
+    with pytest.raises(ValueError, match="fields"):
+        snapshot.Snapshot(bytes(data))